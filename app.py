@@ -1,5 +1,7 @@
 import streamlit as st
 from data.database import init_db, init_supplier, init_esg_sector_risks, init_supplier_watchlist, init_region_risk, init_audit_log, insert_esg_scores, insert_to_suppliers_watchlist, insert_to_suppliers_watchlist2, insert_to_region_risks
+from data.migrations import migrate
+from utils.scoring_utils import fill_latest_scores
 
 st.set_page_config(page_title="Home", layout="wide")
 
@@ -10,6 +12,8 @@ init_esg_sector_risks()
 init_supplier_watchlist()
 init_region_risk()
 init_audit_log()
+migrate()
+fill_latest_scores()
 
 # Must run once only
 #insert_esg_scores()
@@ -0,0 +1,118 @@
+"""
+Memory and throughput of the streaming watchlist loader against the original pandas loader.
+
+Writes a synthetic BIR export (cp1252, names from bir_rate2.csv made unique) of --rows rows, then loads
+it into a copy of esg_scoring.db in separate processes, so each one's peak RSS is its own. Workers
+import everything before taking their baseline and turn off mmap, whose mapped database pages would
+otherwise show up in RSS:
+
+    pandas     read_csv of the whole file, list of tuples, one executemany (the old insert_to_suppliers_watchlist)
+    streaming  refresh_watchlist: csv module with encoding detection, batched staging, SQL diff
+    re-run     streaming again on the same file with 1% of the rows changed (only the diff is applied)
+
+Usage: python benchmarks/bench_bir_loader.py [--rows 1000000]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BIR_CSV = os.path.join(ROOT, "data", "csvs", "bir_rate2.csv")
+REPO_DB = os.path.join(ROOT, "esg_scoring.db")
+
+def write_export(path, rows, changed_share=0.0, seed=0):
+    random.seed(seed)
+    with open(BIR_CSV, newline="", encoding="cp1252") as f:
+        base = [(r["BUSINESS_NAME"], r["RISK_TAG"]) for r in csv.DictReader(f)]
+    with open(path, "w", newline="", encoding="cp1252") as f:
+        writer = csv.writer(f)
+        writer.writerow(["BUSINESS_NAME", "RISK_TAG"])
+        for i in range(rows):
+            name, tag = base[i % len(base)]
+            if changed_share and random.random() < changed_share:
+                tag = f"{tag} (amended)"
+            writer.writerow([f"{name} NO. {i} PEÑA", tag])
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_pandas(csv_path):
+    import pandas as pd
+    from data.connection import get_connection
+    conn = get_connection()
+    df = pd.read_csv(csv_path, encoding="cp1252")
+    records = list(df[["BUSINESS_NAME", "RISK_TAG"]].itertuples(index=False, name=None))
+    conn.executemany("INSERT INTO supplier_watchlist (business_name, risk_tag) VALUES (?, ?)", records)
+    conn.commit()
+    return {"inserted": len(records)}
+
+def run_streaming(csv_path):
+    from data.watchlist import refresh_watchlist
+    return refresh_watchlist("bir", location=csv_path, rescreen=False, warm=False)
+
+def worker(method, csv_path):
+    import pandas, data.watchlist, data.connection
+    data.connection.MMAP_SIZE = 0
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    stats = run_pandas(csv_path) if method == "pandas" else run_streaming(csv_path)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak_rss_mb(), "baseline_rss_mb": baseline, "stats": stats}))
+
+def spawn(method, csv_path, db, cache):
+    env = dict(os.environ, CLARITYESG_DB_PATH=db, CLARITYESG_FETCH_CACHE=cache)
+    out = subprocess.run([sys.executable, __file__, "--worker", method, "--csv", csv_path],
+                         env=env, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--worker", choices=["pandas", "streaming"])
+    parser.add_argument("--csv")
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.worker, args.csv)
+
+    from data.connection import set_db_path
+    from data.migrations import migrate
+
+    with tempfile.TemporaryDirectory() as tmp:
+        export, amended = os.path.join(tmp, "bir_export.csv"), os.path.join(tmp, "bir_export_amended.csv")
+        write_export(export, args.rows)
+        write_export(amended, args.rows, changed_share=0.01, seed=1)
+        size_mb = os.path.getsize(export) / 1024 / 1024
+
+        dbs = {}
+        for method in ("pandas", "streaming"):
+            dbs[method] = os.path.join(tmp, f"{method}.db")
+            shutil.copy(REPO_DB, dbs[method])
+            set_db_path(dbs[method])
+            migrate()
+        cache = os.path.join(tmp, "cache")
+
+        results = {
+            "pandas": spawn("pandas", export, dbs["pandas"], cache),
+            "streaming": spawn("streaming", export, dbs["streaming"], cache),
+            "re-run (1% changed)": spawn("streaming", amended, dbs["streaming"], cache),
+        }
+
+    print(f"\n{args.rows:,} rows ({size_mb:.0f} MB cp1252 csv)\n")
+    print(f"{'method':<22}{'seconds':>9}{'rows/s':>11}{'peak RSS':>11}{'over baseline':>15}  result")
+    for method, r in results.items():
+        stats = {k: v for k, v in r["stats"].items() if k in ("inserted", "deleted", "unchanged")}
+        print(f"{method:<22}{r['seconds']:>9.1f}{args.rows / r['seconds']:>11,.0f}{r['peak_rss_mb']:>9.0f}MB"
+              f"{r['peak_rss_mb'] - r['baseline_rss_mb']:>13.0f}MB  {stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+OCR payload sizes before and after utils/image_prep.py.
+
+Prepares every image in sample_files/ and every page of the distinct PDFs in sample_files/ and
+data/uploads/ (as if each page had no usable text layer) and compares the base64 payload with the
+previous encoding: the page rendered at 72 DPI, or the upload at full size, as default-quality JPEG.
+No API calls are made.
+
+Usage: python benchmarks/bench_image_prep.py [paths ...]
+"""
+import argparse
+import base64
+import glob
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fitz
+from PIL import Image
+
+from utils.image_prep import choose_dpi, image_prep_info, prepare_image, render_page
+from utils.ocr_cache import file_digest
+
+LEGACY_DPI = 72
+
+def legacy_bytes(img):
+    # Base64 payload of the previous encoding: the image as is, default-quality JPEG
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, format="JPEG")
+    return len(base64.b64encode(buf.getvalue()))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob(os.path.join(ROOT, "sample_files", "*"))
+                                 + glob.glob(os.path.join(ROOT, "data", "uploads", "**", "*.pdf"), recursive=True))
+    seen = set()
+    totals = {"requests": 0, "bytes": 0, "baseline_bytes": 0}
+    print(f"\n{'input':<56}{'sent as':>18}{'before':>10}{'after':>10}{'saved':>8}{'ms':>6}")
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        if file_digest(data) in seen:
+            continue
+        seen.add(file_digest(data))
+        name = os.path.relpath(path, ROOT)
+
+        if path.lower().endswith(".pdf"):
+            items = []
+            for page in fitz.open(stream=data, filetype="pdf"):
+                start = time.perf_counter()
+                dpi = choose_dpi(page)
+                prepared = prepare_image(render_page(page, dpi))
+                elapsed = time.perf_counter() - start
+                baseline = legacy_bytes(render_page(page, LEGACY_DPI))
+                items.append((f"{name} p{page.number + 1} @{dpi}dpi", prepared, baseline, elapsed))
+        else:
+            img = Image.open(io.BytesIO(data))
+            start = time.perf_counter()
+            prepared = prepare_image(img, len(data))
+            items = [(name, prepared, legacy_bytes(img), time.perf_counter() - start)]
+
+        for label, p, baseline, elapsed in items:
+            sent = f"{p['width']}x{p['height']} {p['ext']}"
+            print(f"{label[-56:]:<56}{sent:>18}{baseline:>10,}{p['bytes']:>10,}"
+                  f"{1 - p['bytes'] / baseline:>8.0%}{elapsed * 1000:>6.0f}")
+            totals["requests"] += 1
+            totals["bytes"] += p["bytes"]
+            totals["baseline_bytes"] += baseline
+
+    saved = totals["baseline_bytes"] - totals["bytes"]
+    print(f"\n{totals['requests']} requests: {totals['baseline_bytes']:,} -> {totals['bytes']:,} base64 bytes, "
+          f"{saved:,} saved ({saved / totals['baseline_bytes']:.0%})")
+    info = image_prep_info()
+    print(f"as reported in production (image_prep_info): {info['input_bytes']:,} input bytes -> {info['bytes']:,}, "
+          f"{info['bytes_saved']:,} saved")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Query timings before and after the schema migrations (indexes) at 100k audit rows.
+
+Usage: python benchmarks/bench_indexes.py [--smes 2000] [--audits 100000] [--suppliers 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.connection import get_connection, set_db_path
+from data import database
+from data.migrations import migrate
+
+QUERIES = {
+    "supplier by sme_id": ("SELECT supplier_id, supplier_name FROM supplier WHERE sme_id = ?", lambda n: (random.randint(1, n),)),
+    "latest audit for sme": ("SELECT explanation_json FROM audit_log WHERE sme_id = ? ORDER BY created_at DESC LIMIT 1", lambda n: (random.randint(1, n),)),
+    "all audits for sme": ("SELECT * FROM audit_log WHERE sme_id = ?", lambda n: (random.randint(1, n),)),
+}
+
+def seed(conn, n_smes, n_audits, n_suppliers):
+    conn.executemany(
+        "INSERT INTO sme (business_name, industry_sector, region) VALUES (?, ?, ?)",
+        [(f"SME {i}", "Manufacturing", "National Capital Region (NCR)") for i in range(n_smes)]
+    )
+    conn.executemany(
+        "INSERT INTO supplier (sme_id, supplier_name, supplier_sector, supplier_region, supplier_permit) VALUES (?, ?, ?, ?, ?)",
+        [(random.randint(1, n_smes), f"Supplier {i}", "Manufacturing", "National Capital Region (NCR)", 1) for i in range(n_suppliers)]
+    )
+    conn.executemany(
+        "INSERT INTO audit_log (sme_id, explanation_json, created_at) VALUES (?, ?, datetime('2025-01-01', ? || ' minutes'))",
+        [(random.randint(1, n_smes), '{"final_score": 50.0}', i) for i in range(n_audits)]
+    )
+    conn.commit()
+
+def time_queries(conn, n_smes, repeat):
+    timings = {}
+    for label, (sql, params) in QUERIES.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params(n_smes)).fetchall()
+        timings[label] = (time.perf_counter() - start) / repeat * 1000
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--smes", type=int, default=2000)
+    parser.add_argument("--audits", type=int, default=100_000)
+    parser.add_argument("--suppliers", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        set_db_path(os.path.join(tmp, "bench.db"))
+        database.init_db()
+        database.init_supplier()
+        database.init_audit_log()
+        database.init_supplier_watchlist()
+        conn = get_connection()
+        seed(conn, args.smes, args.audits, args.suppliers)
+
+        before = time_queries(conn, args.smes, args.repeat)
+        migrate()
+        conn.execute("ANALYZE")
+        after = time_queries(conn, args.smes, args.repeat)
+
+        print(f"\n{'query':<24}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+        for label in QUERIES:
+            print(f"{label:<24}{before[label]:>14.3f}{after[label]:>14.3f}{before[label] / after[label]:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
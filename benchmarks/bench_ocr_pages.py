@@ -0,0 +1,83 @@
+"""
+Wall time of multi-page PDF OCR, one request at a time against ocr_pdf_pages' concurrency.
+
+Builds a synthetic PDF and replaces the GPT-4o call with a stub that sleeps --latency seconds and
+times out on --fail-rate of the requests, so no API key is needed. Each run starts from an empty
+OCR cache in a temporary directory; every run must return the same texts in page order.
+
+Usage: python benchmarks/bench_ocr_pages.py [--pages 12] [--latency 0.8] [--fail-rate 0.1] [--concurrency 1 4 8]
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+import openai
+
+from utils import ai_utils, ocr_cache
+
+def build_pdf(pages):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Bench page {i + 1}", fontsize=24)
+        page.insert_text((72, 120), "Meralco bill  kWh 1,234.5  PHP 12,345.67", fontsize=11)
+    return doc.tobytes()
+
+def stub_ocr(latency, fail_rate, counters, lock):
+    def run_gpt_ocr(base64_img, ext="jpeg"):
+        with lock:
+            counters["requests"] += 1
+            counters["in_flight"] += 1
+            counters["peak"] = max(counters["peak"], counters["in_flight"])
+        try:
+            time.sleep(latency)
+            if random.random() < fail_rate:
+                counters["failures"] += 1
+                raise openai.APITimeoutError(request=None)
+            return f"page image {hashlib.sha1(base64_img.encode()).hexdigest()}"
+        finally:
+            with lock:
+                counters["in_flight"] -= 1
+    return run_gpt_ocr
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.8)
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    random.seed(0)
+    ai_utils.OCR_BACKOFF_BASE = 0.2
+    data = build_pdf(args.pages)
+    sha256 = ocr_cache.file_digest(data)
+    # The stub's answer depends only on the rendered page, so every run must agree
+    expected = None
+    print(f"\n{args.pages} pages, {args.latency}s per request, {args.fail_rate:.0%} timeouts\n")
+    print(f"{'concurrency':<13}{'seconds':>9}{'requests':>10}{'retried':>9}{'peak':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n, concurrency in enumerate(args.concurrency):
+            ocr_cache.CACHE_PATH = os.path.join(tmp, f"ocr_cache_{n}.db")
+            counters = {"requests": 0, "in_flight": 0, "peak": 0, "failures": 0}
+            ai_utils.run_gpt_ocr = stub_ocr(args.latency, args.fail_rate, counters, threading.Lock())
+            start = time.perf_counter()
+            texts = [p["text"] for p in ai_utils.ocr_pdf_pages(data, sha256, concurrency=concurrency, text_layer=False)]
+            elapsed = time.perf_counter() - start
+            if expected is None:
+                expected = texts
+            elif texts != expected:
+                print(f"❌ concurrency {concurrency}: pages differ from the first run")
+                sys.exit(1)
+            print(f"{concurrency:<13}{elapsed:>9.2f}{counters['requests']:>10}{counters['failures']:>9}{counters['peak']:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Hit rates and latency of the score_sme cache.
+
+Seeds a copy of esg_scoring.db like bench_score_many.py, then renders the SME list page by page
+(score_sme for every SME on it), the way pages/sme_analysis.py does:
+
+    cold        empty cache, every SME is computed
+    warm        same pages again, answered from memory
+    restart     memory cleared (a new process), answered from the sme_latest_score table
+    edited      after supplier/SME edits through data/database.py on --edits SMEs, only those recompute
+
+Usage: python benchmarks/bench_score_cache.py [--smes 2000] [--edits 50]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_score_many import seed
+from data import database
+from data.audit import flush_audit_log
+from data.connection import get_connection, set_db_path
+from data.migrations import migrate
+from utils import scoring_utils
+from utils.scoring_utils import score_cache_info, score_sme
+
+REPO_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "esg_scoring.db")
+
+def render_all(rows):
+    before = score_cache_info()
+    start = time.perf_counter()
+    for sme_id, sector, region in rows:
+        score_sme(sme_id, sector, region)
+    elapsed = time.perf_counter() - start
+    after = score_cache_info()
+    delta = {k: after[k] - before[k] for k in ("memory_hits", "db_hits", "misses", "stale")}
+    return elapsed, delta
+
+def edit(conn, sme_ids):
+    # One of each invalidating operation, round robin
+    for i, sme_id in enumerate(sme_ids):
+        supplier = conn.execute("SELECT supplier_id, supplier_name FROM supplier WHERE sme_id = ? LIMIT 1", (sme_id,)).fetchone()
+        op = i % 4
+        if op == 0 or supplier is None:
+            database.add_supplier(sme_id, "Bench Added Supplier", "Agriculture", "NCR", 1)
+        elif op == 1:
+            database.update_supplier(supplier[0], supplier[1] + " Inc", "Agriculture", "NCR", sme_id)
+        elif op == 2:
+            database.delete_supplier(supplier[0])
+        else:
+            database.update_sme_files(sme_id, "permit.pdf", "payroll.pdf", "bir.pdf")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--smes", type=int, default=2000)
+    parser.add_argument("--edits", type=int, default=50)
+    parser.add_argument("--max-suppliers", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "bench.db")
+        shutil.copy(REPO_DB, db)
+        set_db_path(db)
+        migrate()
+        conn = get_connection()
+        seed(conn, args.smes, args.max_suppliers, 300)
+        rows = conn.execute("SELECT sme_id, industry_sector, region FROM sme ORDER BY sme_id").fetchall()
+
+        results = {}
+        results["cold"] = render_all(rows)
+        flush_audit_log()
+        results["warm"] = render_all(rows)
+        scoring_utils._score_memory.clear()
+        results["restart"] = render_all(rows)
+
+        edited = random.sample([r[0] for r in rows], args.edits)
+        edit(conn, edited)
+        results["edited"] = render_all(rows)
+        flush_audit_log()
+        cached = conn.execute("SELECT COUNT(*) FROM sme_latest_score").fetchone()[0]
+
+    print(f"\n{args.smes} SMEs, {args.edits} edited\n")
+    print(f"{'pass':<10}{'ms/SME':>9}{'memory':>9}{'db':>7}{'misses':>8}{'stale':>7}{'hit rate':>10}")
+    for name, (elapsed, d) in results.items():
+        hit_rate = (d["memory_hits"] + d["db_hits"]) / len(rows)
+        print(f"{name:<10}{elapsed / len(rows) * 1000:>9.2f}{d['memory_hits']:>9}{d['db_hits']:>7}{d['misses']:>8}{d['stale']:>7}{hit_rate:>10.1%}")
+    info = score_cache_info()
+    print(f"\noverall hit rate {info['hit_rate']:.1%}, {info['invalidations']} invalidations, {cached} rows in sme_latest_score")
+    sys.exit(0 if results["edited"][1]["misses"] == args.edits and results["edited"][1]["stale"] == 0 else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Parity check and throughput of score_many() against score_sme().
+
+Seeds a copy of esg_scoring.db (sector, region and watchlist tables are kept) with synthetic
+SMEs and suppliers, scores a sample with compute_sme_score (score_sme without the audit write) and
+everything with score_many, checks that both agree and extrapolates the per-SME cost of score_sme
+to the whole table.
+
+Usage: python benchmarks/bench_score_many.py [--smes 50000] [--sample 200]
+"""
+import argparse
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.connection import get_connection, set_db_path
+from data.migrations import migrate
+from utils.scoring_utils import compute_sme_score, score_many, WASTE_MANAGEMENT_SCORES, FIN_REPORTING_SCORES
+
+REPO_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "esg_scoring.db")
+
+def random_usage(unit):
+    return random.choice([None, f"0 {unit}", f"{random.uniform(0, 10000):.1f} {unit}", f"{random.randint(0, 150)} {unit}"])
+
+def seed(conn, n_smes, max_suppliers, name_pool):
+    sectors = [r[0] for r in conn.execute("SELECT sector FROM esg_sector_risks")]
+    regions = [r[0] for r in conn.execute("SELECT region FROM region_risks")]
+    watch = [r[0] for r in conn.execute("SELECT business_name FROM supplier_watchlist LIMIT 200")]
+    names = [random.choice(watch) if random.random() < 0.3 else f"Supplier Trading {i}" for i in range(name_pool)]
+
+    conn.execute("DELETE FROM sme")
+    smes = []
+    for i in range(1, n_smes + 1):
+        smes.append((
+            i, f"SME {i}", random.choice(sectors), random.choice(regions), random.randint(0, 1),
+            random.randint(0, 10), random.randint(0, 1), random_usage("kwh"),
+            random.choice([None, f"{random.randint(0, 150)} m3", f"{random.randint(0, 150)} l"]),
+            random.choice(list(WASTE_MANAGEMENT_SCORES) + ["Other"]), random.randint(0, 1), random_usage("kg CO2e"),
+            random.uniform(0, 100), random.uniform(0, 100), random.uniform(0, 100), random.uniform(0, 100),
+            random.uniform(0, 100), random.choice(list(FIN_REPORTING_SCORES) + ["Never"]), random.randint(0, 1),
+            random.uniform(0, 100),
+        ))
+    conn.executemany("""
+        INSERT INTO sme (sme_id, business_name, industry_sector, region, is_profitable, market_competition, has_bcp,
+            energy_usage, water_usage, waste_management, denr_permits, ghg_emissions, pct_emp_health, pct_emp_sss,
+            emp_turnover_rate, workplace_safety, emergency_preparedness, fin_reporting_freq, has_policies, inspection_score)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, smes)
+    conn.executemany(
+        "INSERT INTO supplier (sme_id, supplier_name, supplier_sector, supplier_region, supplier_permit) VALUES (?, ?, ?, ?, ?)",
+        [(i, random.choice(names), random.choice(sectors), random.choice(regions), random.randint(0, 1))
+         for i in range(1, n_smes + 1) for _ in range(random.randint(0, max_suppliers))]
+    )
+    conn.commit()
+    return sectors, regions
+
+def same(a, e):
+    # NaN only matches NaN, abs(a - e) > 1e-9 is False as soon as either side is NaN
+    if math.isnan(a) or math.isnan(e):
+        return math.isnan(a) and math.isnan(e)
+    return abs(a - e) <= 1e-9
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--smes", type=int, default=50_000)
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--max-suppliers", type=int, default=3)
+    parser.add_argument("--name-pool", type=int, default=300)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "bench.db")
+        shutil.copy(REPO_DB, db)
+        set_db_path(db)
+        migrate()
+        conn = get_connection()
+        seed(conn, args.smes, args.max_suppliers, args.name_pool)
+
+        start = time.perf_counter()
+        batch = score_many()
+        batch_time = time.perf_counter() - start
+
+        sample = random.sample(range(1, args.smes + 1), args.sample)
+        rows = dict((r[0], r[1:]) for r in conn.execute("SELECT sme_id, industry_sector, region FROM sme"))
+        start = time.perf_counter()
+        mismatches = 0
+        for sme_id in sample:
+            (final, fin, env, soc, gov, explanation), _ = compute_sme_score(sme_id, *rows[sme_id])
+            got = batch.loc[sme_id]
+            expected = [final, fin, env, soc, gov, explanation["governance_score"], explanation["suppliers_score"]]
+            actual = got[["final_score", "financial_score", "environmental_score", "social_score",
+                          "gov_score", "governance_score", "suppliers_score"]].tolist()
+            if not all(same(a, e) for a, e in zip(actual, expected)):
+                mismatches += 1
+                print(f"❌ SME {sme_id}: score_sme={expected} score_many={actual}")
+        single_time = (time.perf_counter() - start) / args.sample
+
+        print(f"\nparity: {args.sample - mismatches}/{args.sample} sampled SMEs identical (tolerance 1e-9)")
+        print(f"score_many: {args.smes} SMEs in {batch_time:.2f}s ({args.smes / batch_time:,.0f} SMEs/s)")
+        print(f"score_sme:  {single_time * 1000:.2f} ms/SME, ~{single_time * args.smes:.0f}s for {args.smes} SMEs")
+        print(f"speedup:    {single_time * args.smes / batch_time:.0f}x")
+        sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark of the similarity scorers on the real BIR watchlist names (data/csvs/bir_rate2.csv).
+
+For each scorer, runs the same queries (bir names with random edits) through WatchlistIndex.match
+with the cascade, and reports latency, how many candidates each cascade stage dropped, and matches.
+token_set and jaro_winkler are not indexed and compare every entry, which is why they are kept to
+offline bulk screening.
+
+Usage: python benchmarks/bench_scorers.py [--queries 300] [--threshold 0.8]
+"""
+import argparse
+import csv
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.similarity import SCORERS
+from utils.watchlist_index import WatchlistIndex, clean_sme_name
+
+BIR_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "csvs", "bir_rate2.csv")
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ "
+
+def load_bir_names():
+    with open(BIR_CSV, newline="", encoding="cp1252") as f:
+        return [(row["BUSINESS_NAME"], row["RISK_TAG"]) for row in csv.DictReader(f)]
+
+def mutate(name, edits):
+    chars = list(name)
+    for _ in range(edits):
+        i = random.randint(0, len(chars))
+        if random.random() < 0.5:
+            chars.insert(i, random.choice(LETTERS))
+        elif i < len(chars):
+            chars[i] = random.choice(LETTERS)
+    return "".join(chars)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    random.seed(0)
+    entries = load_bir_names()
+    index = WatchlistIndex(entries)
+    names = [name for name, _ in entries]
+    queries = [mutate(random.choice(names), random.randint(0, 3)) for _ in range(args.queries)]
+
+    print(f"{len(entries)} bir_rate2.csv names, {len(queries)} queries, threshold {args.threshold}\n")
+    print(f"{'scorer':<14}{'ms/query':>10}{'candidates':>12}{'vector':>9}{'bound 0':>9}{'bound 1':>9}{'scored':>9}{'matches':>9}")
+    for name in SCORERS:
+        stats = {}
+        start = time.perf_counter()
+        for q in queries:
+            index.match(q, args.threshold, k=1, scorer=name, stats=stats)
+        elapsed = (time.perf_counter() - start) / len(queries) * 1000
+        per_query = lambda key: stats.get(key, 0) / len(queries)
+        print(f"{name:<14}{elapsed:>10.3f}{per_query('candidates'):>12.0f}{per_query('vector_pruned'):>9.0f}"
+              f"{per_query('pruned_bound_0'):>9.0f}{per_query('pruned_bound_1'):>9.0f}{per_query('scored'):>9.1f}"
+              f"{per_query('matched'):>9.2f}")
+
+    # The plain SequenceMatcher scan check_supplier used before the index and the cascade
+    clean_names = [clean_sme_name(name) for name in names]
+    start = time.perf_counter()
+    for q in queries:
+        s_clean = clean_sme_name(q)
+        [c for c in clean_names if difflib.SequenceMatcher(None, s_clean, c).ratio() >= args.threshold]
+    elapsed = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"{'ratio (scan)':<14}{elapsed:>10.3f}{len(names):>12}{0:>9}{0:>9}{0:>9}{len(names):>9}")
+
+if __name__ == "__main__":
+    main()
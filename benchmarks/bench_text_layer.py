@@ -0,0 +1,64 @@
+"""
+Which path the PDF pages in sample_files/ and data/uploads/ take, and what the text layer costs.
+
+Runs extract_text_layer on every page (no API calls) and reports per file the pages read locally,
+the pages that would still go to the vision model, and the local extraction time. Files with the
+same bytes are counted once. --show N prints the first N characters of each locally read page.
+
+Usage: python benchmarks/bench_text_layer.py [--show 0] [paths ...]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fitz
+
+from utils.ai_utils import extract_text_layer
+from utils.ocr_cache import file_digest
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--show", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob(os.path.join(ROOT, "sample_files", "*.pdf"))
+                                 + glob.glob(os.path.join(ROOT, "data", "uploads", "**", "*.pdf"), recursive=True))
+    seen = {}
+    totals = {"text_layer": 0, "vision": 0, "seconds": 0.0}
+    print(f"\n{'file':<52}{'pages':>6}{'text':>6}{'vision':>8}{'ms/page':>9}{'chars':>8}")
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = file_digest(data)
+        name = os.path.relpath(path, ROOT)
+        if digest in seen:
+            print(f"{name:<52}  same bytes as {seen[digest]}")
+            continue
+        seen[digest] = name
+
+        doc = fitz.open(stream=data, filetype="pdf")
+        start = time.perf_counter()
+        texts = [extract_text_layer(page) for page in doc]
+        elapsed = time.perf_counter() - start
+        local = [t for t in texts if t is not None]
+        totals["text_layer"] += len(local)
+        totals["vision"] += len(texts) - len(local)
+        totals["seconds"] += elapsed
+        print(f"{name:<52}{len(texts):>6}{len(local):>6}{len(texts) - len(local):>8}"
+              f"{elapsed / len(texts) * 1000:>9.0f}{sum(map(len, local)):>8}")
+        for i, text in enumerate(texts):
+            if text is not None and args.show:
+                print(f"    page {i + 1}: {text[:args.show]!r}")
+
+    pages = totals["text_layer"] + totals["vision"]
+    print(f"\n{len(seen)} distinct PDFs, {pages} pages: {totals['text_layer']} from the text layer, "
+          f"{totals['vision']} to the vision model, {totals['seconds'] / max(pages, 1) * 1000:.0f} ms/page locally")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Parity and latency of the bigram WatchlistIndex against the original full SequenceMatcher scan.
+
+Queries are watchlist names with random edits (so many land near the 0.8 threshold) plus unrelated
+names. The watchlist can be grown with synthetic variants to see how the index scales: every query
+goes through the index, and the full scan (which grows linearly) is only run for the first --parity
+queries. The variants are edits of the real names, so true near matches (and the candidates that
+have to be scored) grow with --grow as well.
+
+Usage: python benchmarks/bench_watchlist_index.py [--queries 500] [--grow 0] [--parity 500]
+"""
+import argparse
+import difflib
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.watchlist_index import WatchlistIndex, clean_sme_name
+
+REPO_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "esg_scoring.db")
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ "
+
+def full_scan(watchlist, supplier_name, threshold):
+    # The check_supplier loop as it was before the index
+    s_clean = clean_sme_name(supplier_name)
+    best = 0.0
+    for business_name, risk_tag in watchlist:
+        score = difflib.SequenceMatcher(None, s_clean, clean_sme_name(business_name)).ratio()
+        if score >= threshold:
+            best = max(best, score)
+    return best
+
+def mutate(name, edits):
+    chars = list(name)
+    for _ in range(edits):
+        i = random.randint(0, len(chars))
+        op = random.random()
+        if op < 0.33:
+            chars.insert(i, random.choice(LETTERS))
+        elif op < 0.66 and i < len(chars):
+            del chars[i]
+        elif i < len(chars):
+            chars[i] = random.choice(LETTERS)
+    return "".join(chars)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--grow", type=int, default=0, help="add this many synthetic watchlist entries")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--parity", type=int, default=500, help="check this many queries against the full scan")
+    args = parser.parse_args()
+
+    random.seed(0)
+    conn = sqlite3.connect(REPO_DB)
+    watchlist = conn.execute("SELECT business_name, risk_tag FROM supplier_watchlist").fetchall()
+    conn.close()
+    base = [name for name, _ in watchlist]
+    watchlist += [(mutate(random.choice(base), random.randint(1, 6)), "SYNTHETIC") for _ in range(args.grow)]
+
+    queries = [mutate(random.choice(base), random.randint(0, 4)) for _ in range(args.queries // 2)]
+    queries += ["".join(random.choice(LETTERS) for _ in range(random.randint(3, 30))) for _ in range(args.queries - len(queries))]
+
+    start = time.perf_counter()
+    index = WatchlistIndex(watchlist)
+    build_time = time.perf_counter() - start
+
+    stats = {}
+    start = time.perf_counter()
+    indexed = []
+    for q in queries:
+        results = index.match(q, args.threshold, k=1, stats=stats)
+        indexed.append(results[0]["score"] if results else 0.0)
+    index_time = (time.perf_counter() - start) / len(queries)
+
+    checked = queries[:args.parity]
+    start = time.perf_counter()
+    scanned = [full_scan(watchlist, q, args.threshold) for q in checked]
+    scan_time = (time.perf_counter() - start) / max(len(checked), 1)
+
+    mismatches = [(q, a, b) for q, a, b in zip(checked, indexed, scanned) if a != b]
+    for q, a, b in mismatches[:10]:
+        print(f"❌ {q!r}: index={a} scan={b}")
+
+    print(f"\nwatchlist entries: {len(watchlist)}, index built in {build_time * 1000:.0f} ms")
+    print(f"candidates: {stats['candidates'] / len(queries):.1f}/query, "
+          f"scored: {stats['scored'] / len(queries):.1f}/query")
+    if checked:
+        print(f"parity: {len(checked) - len(mismatches)}/{len(checked)} identical at threshold {args.threshold}")
+        print(f"full scan: {scan_time * 1000:.3f} ms/query")
+        print(f"index:     {index_time * 1000:.3f} ms/query ({scan_time / index_time:.0f}x)")
+    else:
+        print(f"index:     {index_time * 1000:.3f} ms/query")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
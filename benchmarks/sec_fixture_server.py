@@ -0,0 +1,116 @@
+"""
+Local stand-in for checkwithsec.sec.gov.ph, so the SEC scraper can be run and tested offline.
+
+GET  /check-with-sec/suspended   HTML page with a _csrf input (and a session cookie)
+POST /check-with-sec/suspended   _csrf, user_input, page -> {"status": "success", "response": {"data": [...]}}
+
+Pages past the last one return an empty data list, like the real site. Faults can be injected:
+random 503s, {"status": "error"} bodies, per-request latency, and a hard failure after a given
+number of POSTs (to simulate the site going away mid-run).
+
+Usage: python benchmarks/sec_fixture_server.py [--port 8765] [--pages 115] [--per-page 10] [--fail-rate 0.1]
+"""
+import argparse
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+SUSPENDED_PATH = "/check-with-sec/suspended"
+
+def company(page, i):
+    return {"company_name": f"FIXTURE SUSPENDED CORPORATION {page:03d}-{i:02d}", "sec_registration_no": f"CS{page:05d}{i:03d}", "status": "SUSPENDED"}
+
+
+class FixtureState:
+    def __init__(self, pages=115, per_page=10, fail_rate=0.0, error_rate=0.0, latency=0.0, die_after=None, seed=0):
+        self.pages = pages
+        self.per_page = per_page
+        self.fail_rate = fail_rate
+        self.error_rate = error_rate
+        self.latency = latency
+        self.die_after = die_after
+        self.random = random.Random(seed)
+        self.tokens = set()
+        self.posts = 0
+        self.lock = threading.Lock()
+
+    def roll(self):
+        with self.lock:
+            self.posts += 1
+            return self.posts, self.random.random()
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send_body(self, status, body, content_type, headers=()):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path != SUSPENDED_PATH:
+                return self.send_body(404, "not found", "text/plain")
+            token = secrets.token_hex(8)
+            with state.lock:
+                state.tokens.add(token)
+            html = f'<html><body><form><input type="hidden" name="_csrf" value="{token}"></form></body></html>'
+            self.send_body(200, html, "text/html", [("Set-Cookie", f"SESSION={token}; Path=/")])
+
+        def do_POST(self):
+            if self.path != SUSPENDED_PATH:
+                return self.send_body(404, "not found", "text/plain")
+            form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+            posts, roll = state.roll()
+            if state.latency:
+                time.sleep(state.latency)
+
+            if state.die_after is not None and posts > state.die_after:
+                return self.send_body(500, "down", "text/plain")
+            if form.get("_csrf", [None])[0] not in state.tokens:
+                return self.send_body(403, "invalid csrf token", "text/plain")
+            if roll < state.fail_rate:
+                return self.send_body(503, "busy", "text/plain")
+            if roll < state.fail_rate + state.error_rate:
+                return self.send_body(200, json.dumps({"status": "error", "response": "try again"}), "application/json")
+
+            page = int(form.get("page", ["1"])[0])
+            data = [company(page, i) for i in range(state.per_page)] if 1 <= page <= state.pages else []
+            self.send_body(200, json.dumps({"status": "success", "response": {"data": data}}), "application/json")
+    return Handler
+
+def start(port=0, **options):
+    """Serve in a background thread, returns (server, base_url, state). Stop with server.shutdown()."""
+    state = FixtureState(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", state
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=115)
+    parser.add_argument("--per-page", type=int, default=10)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of POSTs answered with 503")
+    parser.add_argument("--error-rate", type=float, default=0.0, help='share of POSTs answered with {"status": "error"}')
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every POST")
+    args = parser.parse_args()
+
+    state = FixtureState(args.pages, args.per_page, args.fail_rate, args.error_rate, args.latency)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(state))
+    print(f"SEC fixture serving {args.pages} pages on http://127.0.0.1:{args.port}{SUSPENDED_PATH}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
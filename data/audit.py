@@ -0,0 +1,227 @@
+"""
+Batched, deduplicated audit_log writer.
+
+Scoring only computes; scores are handed to an AuditWriter, which keeps the newest one per SME in
+memory and writes them from a background thread, a batch per transaction, to audit_log (typed score
+columns, one audit_supplier_detail row per supplier) and to the sme_latest_score row of the SME. Each entry is keyed on the hash of the scoring inputs
+(audit_log.input_hash, sme_latest_score.input_hash):
+
+- an SME whose latest audit row already has that hash is skipped, so viewing an unchanged SME
+  never writes
+- inputs that went back to an earlier state hit the UNIQUE (sme_id, input_hash) index, and
+  INSERT ... ON CONFLICT moves that row back to the top instead of adding a duplicate
+
+Callers that need the audit trail on disk right away (history chart, PDF report) call flush_audit_log().
+"""
+import atexit
+import json
+import math
+import threading
+
+from data.connection import get_connection, get_db_path
+
+AUDIT_BATCH_SIZE = 200
+AUDIT_FLUSH_INTERVAL = 2.0      # seconds between background flushes
+
+# Explanation keys stored as audit_log columns, and the columns of a supplier breakdown
+AUDIT_SCORE_COLUMNS = ("financial_score", "environmental_score", "social_score", "governance_score",
+                       "base_score", "suppliers_score", "final_score")
+SUPPLIER_DETAIL_COLUMNS = ("supplier_name", "name_score", "sector_score", "region_score", "permit_score", "final_supplier_score")
+
+# Millisecond timestamps, so a row moved back to the top within the same second still sorts last
+# (they compare correctly with the second-resolution CURRENT_TIMESTAMP of older rows)
+UPSERT_SQL = f"""
+    INSERT INTO audit_log (sme_id, input_hash, {', '.join(AUDIT_SCORE_COLUMNS)}, created_at)
+    VALUES (?, ?, {', '.join('?' * len(AUDIT_SCORE_COLUMNS))}, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    ON CONFLICT(sme_id, input_hash) DO UPDATE SET
+        {', '.join(f'{c} = excluded.{c}' for c in AUDIT_SCORE_COLUMNS)},
+        created_at = excluded.created_at
+"""
+
+DETAIL_INSERT_SQL = f"""
+    INSERT INTO audit_supplier_detail (audit_id, position, {', '.join(SUPPLIER_DETAIL_COLUMNS)})
+    VALUES (?, ?, {', '.join('?' * len(SUPPLIER_DETAIL_COLUMNS))})
+"""
+
+LATEST_UPSERT_SQL = """
+    INSERT INTO sme_latest_score (sme_id, input_hash, final_score, financial_score, environmental_score,
+                                  social_score, gov_score, suppliers_score, explanation_json, scored_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(sme_id) DO UPDATE SET
+        input_hash = excluded.input_hash,
+        final_score = excluded.final_score,
+        financial_score = excluded.financial_score,
+        environmental_score = excluded.environmental_score,
+        social_score = excluded.social_score,
+        gov_score = excluded.gov_score,
+        suppliers_score = excluded.suppliers_score,
+        explanation_json = excluded.explanation_json,
+        scored_at = excluded.scored_at
+"""
+
+# Hash of the latest audit row of every queued SME that still exists
+LATEST_SQL = """
+    SELECT q.value,
+           (SELECT input_hash FROM audit_log a WHERE a.sme_id = q.value ORDER BY created_at DESC, id DESC LIMIT 1)
+    FROM json_each(?) q
+    WHERE q.value IN (SELECT sme_id FROM sme)
+"""
+
+
+def _real(value):
+    # numpy floats to float; NaN (a supplier with an unknown sector or region) is stored as NULL
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+def _score(value):
+    return float("nan") if value is None else value
+
+def _write_audit(conn, sme_id, input_hash, explanation):
+    conn.execute(UPSERT_SQL, (sme_id, input_hash, *[_real(explanation[c]) for c in AUDIT_SCORE_COLUMNS]))
+    audit_id = conn.execute("SELECT id FROM audit_log WHERE sme_id = ? AND input_hash = ?", (sme_id, input_hash)).fetchone()[0]
+    conn.execute("DELETE FROM audit_supplier_detail WHERE audit_id = ?", (audit_id,))
+    conn.executemany(DETAIL_INSERT_SQL, [
+        (audit_id, position, s["supplier_name"], *[_real(s[c]) for c in SUPPLIER_DETAIL_COLUMNS[1:]])
+        for position, s in enumerate(explanation["suppliers_detail"])
+    ])
+
+def load_explanation(audit_id, db_path=None):
+    """The explanation dict of an audit_log row, as score_sme returns it, or None."""
+    conn = get_connection(db_path)
+    row = conn.execute(f"SELECT {', '.join(AUDIT_SCORE_COLUMNS)} FROM audit_log WHERE id = ?", (audit_id,)).fetchone()
+    if row is None:
+        return None
+    explanation = {c: _score(v) for c, v in zip(AUDIT_SCORE_COLUMNS, row)}
+    details = conn.execute(f"""
+        SELECT {', '.join(SUPPLIER_DETAIL_COLUMNS)} FROM audit_supplier_detail WHERE audit_id = ? ORDER BY position
+    """, (audit_id,)).fetchall()
+    explanation["suppliers_detail"] = [
+        {"supplier_name": d[0], **{c: _score(v) for c, v in zip(SUPPLIER_DETAIL_COLUMNS[1:], d[1:])}}
+        for d in details
+    ]
+    return explanation
+
+
+class AuditWriter:
+    def __init__(self, db_path=None, batch_size=AUDIT_BATCH_SIZE, interval=AUDIT_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending = {}          # sme_id -> (input_hash, typed scores, explanation), newest wins
+        self._written = {}          # sme_id -> input_hash of its latest audit row and cache row
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stats = {"submitted": 0, "skipped": 0, "written": 0, "flushes": 0}
+
+    def submit(self, sme_id, input_hash, scores):
+        """
+        Queue the scores of sme_id, (final, financial, environmental, social, gov, explanation) as
+        returned by compute_sme_score. Nothing is written when they are already on disk.
+        """
+        sme_id = int(sme_id)
+        with self._lock:
+            self._stats["submitted"] += 1
+            if self._written.get(sme_id) == input_hash:
+                self._stats["skipped"] += 1
+                return False
+            typed = (*scores[:5], scores[5]["suppliers_score"])
+            self._pending[sme_id] = (input_hash, typed, scores[5])
+            full = len(self._pending) >= self.batch_size
+        self._start()
+        if full:
+            self._wake.set()
+        return True
+
+    def flush(self):
+        """Write the queued entries, returns the number of audit rows written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            try:
+                conn = get_connection(self.db_path)
+                latest = dict(conn.execute(LATEST_SQL, (json.dumps(list(pending)),)).fetchall())
+                rows = [(sme_id, input_hash, explanation) for sme_id, (input_hash, _, explanation) in pending.items()
+                        if sme_id in latest and latest[sme_id] != input_hash]
+                latest_rows = [(sme_id, input_hash, *[_real(v) for v in scores], json.dumps(explanation))
+                               for sme_id, (input_hash, scores, explanation) in pending.items() if sme_id in latest]
+                with conn:
+                    for row in rows:
+                        _write_audit(conn, *row)
+                    conn.executemany(LATEST_UPSERT_SQL, latest_rows)
+            except Exception:
+                with self._lock:
+                    # Put the batch back unless a newer entry was queued meanwhile
+                    for sme_id, entry in pending.items():
+                        self._pending.setdefault(sme_id, entry)
+                raise
+
+            with self._lock:
+                for sme_id, (input_hash, _, _) in pending.items():
+                    if sme_id in latest:
+                        self._written[sme_id] = input_hash
+                    else:
+                        self._written.pop(sme_id, None)
+                self._stats["written"] += len(rows)
+                self._stats["flushes"] += 1
+            return len(rows)
+
+    def forget(self, sme_id):
+        """Drop what is known to be on disk for sme_id, after its latest score was invalidated."""
+        with self._lock:
+            self._written.pop(int(sme_id), None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ audit_log flush failed, will retry: {e}")
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def audit_writer(db_path=None):
+    """The process-wide AuditWriter for a database (the configured one by default)."""
+    key = db_path or get_db_path()
+    writer = _writers.get(key)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = _writers[key] = AuditWriter(key)
+    return writer
+
+def record_score(sme_id, input_hash, scores, db_path=None):
+    return audit_writer(db_path).submit(sme_id, input_hash, scores)
+
+def flush_audit_log(db_path=None):
+    return audit_writer(db_path).flush()
+
+@atexit.register
+def _flush_all():
+    for writer in list(_writers.values()):
+        try:
+            writer.flush()
+        except Exception as e:
+            print(f"⚠️ audit_log flush at exit failed: {e}")
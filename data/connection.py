@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import threading
+
+# Database location, override with the CLARITYESG_DB_PATH env variable or set_db_path()
+DB_PATH = os.environ.get("CLARITYESG_DB_PATH", "esg_scoring.db")
+
+# Connection tuning
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 20000            # negative cache_size = size in KiB
+MMAP_SIZE = 256 * 1024 * 1024
+CACHED_STATEMENTS = 256          # prepared statements kept per connection
+
+_local = threading.local()
+_migrated = set()                # database paths brought up to date by this process
+_migrate_lock = threading.RLock()
+
+def set_db_path(path):
+    global DB_PATH
+    DB_PATH = path
+
+def get_db_path():
+    return os.path.abspath(DB_PATH)
+
+def _configure(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA foreign_keys=ON")
+
+def _ensure_migrated(conn, db_path):
+    # Streamlit runs pages/ scripts without app.py when they are opened directly, so the first
+    # connection to a database in this process applies pending migrations. A database without the
+    # sme table is new (or not ours, like the OCR cache): app.py creates the base tables and migrates.
+    key = os.path.abspath(db_path)
+    if key in _migrated:
+        return
+    with _migrate_lock:
+        if key in _migrated:
+            return
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sme'").fetchone() is None:
+            return
+        from data.migrations import migrate
+        migrate(db_path)
+        _migrated.add(key)
+
+def get_connection(db_path=None):
+    """
+    Return this thread's connection to the database, opening it on first use.
+
+    Connections are kept per thread and per path, so callers must not close them.
+    Use `with conn:` to commit (or roll back) a unit of work.
+    """
+    db_path = db_path or DB_PATH
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=CACHED_STATEMENTS)
+        _configure(conn)
+        conns[db_path] = conn
+        _ensure_migrated(conn, db_path)
+    return conn
+
+def close_connection(db_path=None):
+    conns = getattr(_local, "conns", {})
+    conn = conns.pop(db_path or DB_PATH, None)
+    if conn is not None:
+        conn.close()
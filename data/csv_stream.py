@@ -0,0 +1,63 @@
+"""
+Streaming CSV reading for large exports (BIR watchlists, vendor files).
+
+Files are decoded incrementally and read row by row with the csv module, never loaded whole. The
+encoding is detected from a sample of the file instead of being hard-coded: a BOM wins, then strict
+UTF-8, then cp1252 (Windows/Excel exports such as bir_rate2.csv), then latin-1 which decodes anything.
+
+A UTF-8 guess only covers the sample, so a detected UTF-8 file is decoded with the "cp1252_fallback"
+error handler: a byte further down that is not valid UTF-8 is read as cp1252 instead of failing the
+ingest halfway through.
+"""
+import codecs
+import csv
+import io
+
+SAMPLE_SIZE = 1 << 20
+FALLBACK_ENCODINGS = ("cp1252", "latin-1")
+
+def _cp1252_fallback(error):
+    # The 5 bytes cp1252 leaves undefined are read as latin-1
+    text = "".join(bytes([b]).decode("cp1252", errors="ignore") or chr(b) for b in error.object[error.start:error.end])
+    return text, error.end
+
+codecs.register_error("cp1252_fallback", _cp1252_fallback)
+
+def _decodes(sample, encoding, truncated):
+    try:
+        sample.decode(encoding)
+        return True
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the end of the sample is not an error
+        return truncated and encoding == "utf-8" and e.start >= len(sample) - 3 and e.reason == "unexpected end of data"
+
+def detect_encoding(f, sample_size=SAMPLE_SIZE):
+    """Encoding of a binary file object, guessed from its first sample_size bytes (the position is restored)."""
+    position = f.tell()
+    sample = f.read(sample_size)
+    f.seek(position)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    truncated = len(sample) == sample_size
+    for encoding in ("utf-8",) + FALLBACK_ENCODINGS:
+        if _decodes(sample, encoding, truncated):
+            return encoding
+    return FALLBACK_ENCODINGS[-1]
+
+def open_csv(f, encoding=None):
+    """
+    csv.DictReader over a binary file object, decoded incrementally.
+
+    Returns:
+        (reader, encoding) where encoding is the one given or detected
+    """
+    errors = "strict"
+    if encoding is None:
+        encoding = detect_encoding(f)
+        if encoding in ("utf-8", "utf-8-sig"):
+            errors = "cp1252_fallback"
+    text = io.TextIOWrapper(f, encoding=encoding, errors=errors, newline="")
+    return csv.DictReader(text), encoding
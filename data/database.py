@@ -1,12 +1,13 @@
-import sqlite3
 import os
 import uuid
 import pandas as pd
-import json
+import re
+from data.audit import flush_audit_log
+from data.connection import get_connection
 
 # Initializations 
 def init_db():
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS sme (
@@ -47,10 +48,9 @@ def init_db():
         );
     """)
     conn.commit()
-    conn.close()
 
 def init_supplier():
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS supplier(
@@ -61,14 +61,13 @@ def init_supplier():
             supplier_region TEXT NOT NULL, 
             supplier_permit BOOLEAN,
             risk_tags TEXT,
-            FOREIGN KEY (sme_id) REFERENCES sme(sme_id)
+            FOREIGN KEY (sme_id) REFERENCES sme(sme_id) ON DELETE CASCADE
         );
     """)
     conn.commit()
-    conn.close()
 
 def init_esg_sector_risks():
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS esg_sector_risks (
@@ -80,10 +79,9 @@ def init_esg_sector_risks():
         );
     """)
     conn.commit()
-    conn.close()
 
 def init_region_risk():
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS region_risks (
@@ -92,10 +90,9 @@ def init_region_risk():
         );
     """)
     conn.commit()
-    conn.close()
 
 def init_supplier_watchlist():
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS supplier_watchlist(
@@ -106,26 +103,25 @@ def init_supplier_watchlist():
         );
     """)
     conn.commit()
-    conn.close()
 
 def init_audit_log():
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS audit_log (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             sme_id INTEGER,
             explanation_json TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sme_id) REFERENCES sme(sme_id) ON DELETE CASCADE
         );
     """)
     conn.commit()
-    conn.close()
 #========================================================================
 # INSERT
 # Must be only used once
 def insert_esg_scores():
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         INSERT INTO esg_sector_risks (sector, env_risk, soc_risk, gov_risk, notes) VALUES
@@ -161,10 +157,9 @@ def insert_esg_scores():
         );
     """)
     conn.commit()
-    conn.close()
 
 def insert_to_region_risks():
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         INSERT INTO region_risks (region, score) VALUES
@@ -187,76 +182,76 @@ def insert_to_region_risks():
             ("Bangsamoro Autonomous Region in Muslim Mindanao (BARMM)", 81.5);
     """)
     conn.commit()
-    conn.close()
 
-# Must be only used once
+# Safe to re-run: each source is diffed against its current rows, see data/watchlist.py
 def insert_to_suppliers_watchlist():  # for bir csv and philgeps
-    from utils.ai_utils import philgeps_blacklist  # import inside function
-    import pandas as pd
-    import sqlite3
-
-    conn = sqlite3.connect("esg_scoring.db")
-    c = conn.cursor()
-    
-    df = pd.read_csv("data/csvs/bir_rate2.csv", encoding="cp1252")
-    df_better = df[["BUSINESS_NAME", "RISK_TAG"]]
-
-    df2 = pd.DataFrame(philgeps_blacklist())
-    df2_better = df2[["BUSINESS_NAME", "RISK_TAG"]]
-
-    records = list(df_better.itertuples(index=False, name=None))
-    c.executemany("INSERT INTO supplier_watchlist (business_name, risk_tag) VALUES (?, ?)", records)
-
-    records2 = list(df2_better.itertuples(index=False, name=None))
-    c.executemany("INSERT INTO supplier_watchlist (business_name, risk_tag) VALUES (?, ?)", records2)
-
-    conn.commit()
-    conn.close()
+    from data.watchlist import refresh_watchlist  # import inside function
+    refresh_watchlist("bir")
+    refresh_watchlist("philgeps")
 
 def insert_to_suppliers_watchlist2():  # for sec
-    from utils.ai_utils import sec_suspended
-    import sqlite3
-    import pandas as pd
-
-    df = sec_suspended()
-    df = df.rename(columns={"company_name":"BUSINESS_NAME"})
-    conn = sqlite3.connect("esg_scoring.db")
-    c = conn.cursor()
-    
-    records = [(name,) for name in df["BUSINESS_NAME"]]
-    c.executemany("INSERT INTO supplier_watchlist (business_name) VALUES (?)", records)
+    from data.watchlist import refresh_watchlist
+    refresh_watchlist("sec")
+
+# Watchlist versioning
+# A stored screening result is current when the supplier was screened at the current version, or
+# before it but covered by the last re-screen pass (watchlist_meta.screened_through, see
+# utils/screening.rescreen_suppliers). Used inside queries on supplier.
+SCREENING_CURRENT_SQL = ("MAX(screened_version, (SELECT screened_through FROM watchlist_meta WHERE id = 1))"
+                         " = (SELECT version FROM watchlist_meta WHERE id = 1)")
+
+def get_watchlist_version(conn=None):
+    conn = conn or get_connection()
+    row = conn.execute("SELECT version FROM watchlist_meta WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+def bump_watchlist_version(conn):
+    """Start a new watchlist version inside the caller's transaction and return it."""
+    conn.execute("UPDATE watchlist_meta SET version = version + 1, last_updated = CURRENT_TIMESTAMP WHERE id = 1")
+    return get_watchlist_version(conn)
 
-    conn.commit()
-    conn.close()
 #========================================================================
 
 # Supplier CRUD
+# Suppliers are screened against the watchlist when they are written, see utils/screening.py, and
+# the cached score of their SME is dropped in the same transaction, see score_sme
 def add_supplier(sme_id, supplier_name, supplier_sector, supplier_region, supplier_permit):
-    conn = sqlite3.connect("esg_scoring.db")
+    from utils.screening import screen_supplier
+    from utils.scoring_utils import invalidate_scores
+    risk_tags, watchlist_version = screen_supplier(supplier_name)
+
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
-        INSERT INTO supplier (sme_id, supplier_name, supplier_sector, supplier_region, supplier_permit)
-        VALUES (?, ?, ?, ?, ?)
-    """, (sme_id, supplier_name, supplier_sector, supplier_region, supplier_permit))
+        INSERT INTO supplier (sme_id, supplier_name, supplier_sector, supplier_region, supplier_permit, risk_tags, screened_version)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (sme_id, supplier_name, supplier_sector, supplier_region, supplier_permit, risk_tags, watchlist_version))
+    invalidate_scores([sme_id], conn)
     conn.commit()
-    conn.close()
 
 def update_supplier(supplier_id, supplier_name, supplier_sector, supplier_region, sme_id):
-    conn = sqlite3.connect("esg_scoring.db")
+    from utils.screening import screen_supplier
+    from utils.scoring_utils import invalidate_scores
+    risk_tags, watchlist_version = screen_supplier(supplier_name)
+
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         UPDATE supplier
-        SET supplier_name = ?, supplier_sector = ?, supplier_region = ? WHERE supplier_id = ? AND sme_id = ?
-    """, (supplier_name, supplier_sector, supplier_region, supplier_id, sme_id))
+        SET supplier_name = ?, supplier_sector = ?, supplier_region = ?, risk_tags = ?, screened_version = ?
+        WHERE supplier_id = ? AND sme_id = ?
+    """, (supplier_name, supplier_sector, supplier_region, risk_tags, watchlist_version, supplier_id, sme_id))
+    invalidate_scores([sme_id], conn)
     conn.commit()
-    conn.close()
 
 def delete_supplier(supplier_id):
-    conn = sqlite3.connect("esg_scoring.db")
+    from utils.scoring_utils import invalidate_scores
+    conn = get_connection()
     c = conn.cursor()
+    sme_ids = [r[0] for r in c.execute("SELECT sme_id FROM supplier WHERE supplier_id = ?", (supplier_id,))]
     c.execute("DELETE FROM supplier WHERE supplier_id = ?", (supplier_id,))
+    invalidate_scores(sme_ids, conn)
     conn.commit()
-    conn.close()
 #========================================================================
 
 # Local Storage (Will change to google cloud on deployment!!!)
@@ -277,20 +272,21 @@ def save_to_uploads(uploaded_file, sme_id, subfolder="data/uploads"):
         return os.path.relpath(save_path)
 
 def update_sme_files(sme_id, business_permit, payroll, bir_income_tax):
-    conn = sqlite3.connect("esg_scoring.db")
+    from utils.scoring_utils import invalidate_scores
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         UPDATE sme
         SET business_permit = ?, payroll = ?, bir_income_tax = ?
         WHERE sme_id = ?
     """, (business_permit, payroll, bir_income_tax, sme_id))
+    invalidate_scores([sme_id], conn)
     conn.commit()
-    conn.close()
 #========================================================================
 
 # == TEMPORARY STUFF ==
 def temp_insert_sme(sme_data):
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     c = conn.cursor()
 
     c.execute("""
@@ -329,28 +325,129 @@ def temp_insert_sme(sme_data):
     ))
     sme_id = c.lastrowid
     conn.commit()
-    conn.close()
     return sme_id
 
 # Getters
-def search_name(business_name):
-    conn = sqlite3.connect("esg_scoring.db")
+def fts_query(text):
+    # Every word must match, the last one as a prefix: "metro est" -> "metro" "est"*
+    tokens = re.findall(r"\w+", text.lower())
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def search_name(business_name, limit=20, offset=0):
+    query = fts_query(business_name)
+    if query is None:
+        return []
+
+    conn = get_connection()
     c = conn.cursor()
-    c.execute("SELECT sme_id, business_name, industry_sector, region, created_at FROM sme WHERE business_name LIKE ? ORDER BY business_name", (f"%{business_name}%",))
+    c.execute("""
+        SELECT s.sme_id, s.business_name, s.industry_sector, s.region, s.created_at
+        FROM sme_fts
+        JOIN sme s ON s.sme_id = sme_fts.rowid
+        WHERE sme_fts MATCH ?
+        ORDER BY sme_fts.rank, s.business_name
+        LIMIT ? OFFSET ?
+    """, (query, limit, offset))
     s_name = c.fetchall()
-    conn.close()
     return s_name
 
-def get_all_smes():
-    conn = sqlite3.connect("esg_scoring.db")
+def list_smes(cursor=None, limit=20, sector=None, region=None, order_by="sme_id", min_score=None, max_score=None):
+    """
+    Keyset-paginated SME listing, newest first when ordered by created_at.
+
+    Args:
+        cursor: value returned as next_cursor by the previous page, None for the first page
+        limit: page size
+        sector, region: optional exact-match filters
+        order_by: "sme_id" (ascending), "created_at" (descending), "score" (lowest final score, i.e.
+            riskiest, first) or "score_desc"
+        min_score, max_score: optional inclusive bounds on the final score
+
+    Scores come from sme_latest_score; SMEs without a stored score are left out when ordering or
+    filtering by score (see fill_latest_scores).
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+    """
+    where, params = [], []
+    if sector:
+        where.append("s.industry_sector = ?")
+        params.append(sector)
+    if region:
+        where.append("s.region = ?")
+        params.append(region)
+    if min_score is not None:
+        where.append("l.final_score >= ?")
+        params.append(min_score)
+    if max_score is not None:
+        where.append("l.final_score <= ?")
+        params.append(max_score)
+
+    if order_by == "sme_id":
+        if cursor is not None:
+            where.append("s.sme_id > ?")
+            params.append(cursor)
+        order = "s.sme_id ASC"
+    elif order_by == "created_at":
+        if cursor is not None:
+            where.append("(s.created_at, s.sme_id) < (?, ?)")
+            params.extend(cursor)
+        order = "s.created_at DESC, s.sme_id DESC"
+    elif order_by == "score":
+        if cursor is not None:
+            where.append("(l.final_score, s.sme_id) > (?, ?)")
+            params.extend(cursor)
+        order = "l.final_score ASC, s.sme_id ASC"
+    elif order_by == "score_desc":
+        if cursor is not None:
+            where.append("(l.final_score, s.sme_id) < (?, ?)")
+            params.extend(cursor)
+        order = "l.final_score DESC, s.sme_id DESC"
+    else:
+        raise ValueError(f"Cannot order SMEs by {order_by!r}")
+
+    by_score = order_by in ("score", "score_desc") or min_score is not None or max_score is not None
+    sql = "SELECT s.sme_id, s.business_name, s.industry_sector, s.region, s.created_at, l.final_score FROM sme s"
+    if by_score:
+        sql += " JOIN sme_latest_score l ON l.sme_id = s.sme_id"
+        where.append("l.final_score IS NOT NULL")
+    else:
+        sql += " LEFT JOIN sme_latest_score l ON l.sme_id = s.sme_id"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order} LIMIT ?"
+
+    conn = get_connection()
     c = conn.cursor()
-    c.execute("SELECT sme_id, business_name, industry_sector, region, created_at FROM sme ORDER BY sme_id ASC")
-    data = c.fetchall()
-    conn.close()
-    return data
+    # One extra row tells us whether another page exists
+    c.execute(sql, (*params, limit + 1))
+    rows = c.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if order_by == "sme_id":
+            next_cursor = last[0]
+        elif order_by == "created_at":
+            next_cursor = (last[4], last[0])
+        else:
+            next_cursor = (last[5], last[0])
+    return [row[:5] for row in rows], next_cursor
+
+def get_sme_filters():
+    conn = get_connection()
+    c = conn.cursor()
+    sectors = [r[0] for r in c.execute("SELECT DISTINCT industry_sector FROM sme WHERE industry_sector IS NOT NULL ORDER BY industry_sector")]
+    regions = [r[0] for r in c.execute("SELECT DISTINCT region FROM sme WHERE region IS NOT NULL AND region != '' ORDER BY region")]
+    return sectors, regions
 
 def get_id(sme_id):
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
 
     # Get sme detail
     df1 = pd.read_sql("""
@@ -365,20 +462,25 @@ def get_id(sme_id):
         FROM supplier
         WHERE sme_id = ?
     """, conn, params=(sme_id,))
-    conn.close()
 
     return df1,df2
 
-def get_audit_score(sme_id):
-    conn = sqlite3.connect("esg_scoring.db")
-    df = pd.read_sql("SELECT * FROM audit_log WHERE sme_id = ?", conn, params=(sme_id,))
-    df['final_score'] = df['explanation_json'].apply(lambda x: json.loads(x)['final_score'])
+def get_audit_score(sme_id, limit=None):
+    # Score history of an SME, newest first (the most recent limit entries)
+    # Write out queued scores first so the history includes the one just computed
+    flush_audit_log()
+    conn = get_connection()
+    df = pd.read_sql("""
+        SELECT id, sme_id, created_at, final_score, financial_score, environmental_score, social_score,
+               governance_score, suppliers_score
+        FROM audit_log WHERE sme_id = ?
+        ORDER BY created_at DESC, id DESC LIMIT ?
+    """, conn, params=(sme_id, -1 if limit is None else limit))
     return df
 
 def display_sme_data(sme_id):
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     df = pd.read_sql("SELECT * FROM sme where sme_id = ?", conn, params=(sme_id,))
-    conn.close()
 
     # Rename labels
     FIELD_LABELS = {
@@ -427,12 +529,11 @@ def display_sme_data(sme_id):
     df_transformed["Field"] = df_transformed["Field"].replace(FIELD_LABELS)
     return df_transformed
 
-# delete sme
+# delete sme (suppliers, audit_log and sme_latest_score rows go with it through ON DELETE CASCADE)
 def delete_sme(sme_id):
-    conn = sqlite3.connect("esg_scoring.db")
+    from utils.scoring_utils import invalidate_scores
+    conn = get_connection()
     c = conn.cursor()
-    c.execute("DELETE FROM supplier WHERE sme_id = ?", (sme_id,))
-    c.execute("DELETE FROM audit_log WHERE sme_id = ?", (sme_id,))
     c.execute("DELETE FROM sme WHERE sme_id = ?", (sme_id,))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    invalidate_scores([sme_id], conn)
+    conn.commit()
\ No newline at end of file
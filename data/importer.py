@@ -0,0 +1,391 @@
+"""
+Bulk SME and supplier importer.
+
+Streams CSV or JSONL files, validates each row and inserts sme and supplier records with
+executemany in large transactions. Column names follow the sme and supplier tables.
+JSONL SME rows may carry their suppliers inline under a "suppliers" key; supplier files
+reference their SME by sme_id or by sme_business_name. Imported suppliers are screened against
+the watchlist once their file is in, and CSV encodings are detected (see data/csv_stream.py).
+
+Usage:
+    python -m data.importer smes.csv [--suppliers suppliers.csv] [--batch-size 5000] [--errors errors.csv]
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+from data.connection import get_connection, set_db_path
+from data.csv_stream import open_csv
+
+# sme columns accepted by the importer, with their parser and the default the input form would give
+SME_FIELDS = {
+    "business_name": (str, None),
+    "business_permit": (str, None),
+    "industry_sector": (str, None),
+    "region": (str, None),
+    "num_employees": (int, 0),
+    "avg_annual_revenue": (float, 0.0),
+    "years_in_operation": (int, 0),
+    "is_profitable": (bool, False),
+    "sector_stability": (float, None),
+    "market_competition": (int, 0),
+    "location_hazard": (float, None),
+    "has_bcp": (bool, False),
+    "energy_usage": (str, None),
+    "water_usage": (str, None),
+    "waste_management": (str, "No formal waste management policy"),
+    "denr_permits": (bool, False),
+    "ghg_emissions": (str, None),
+    "pct_emp_health": (float, 0.0),
+    "pct_emp_sss": (float, 0.0),
+    "emp_turnover_rate": (float, 0.0),
+    "payroll": (str, None),
+    "csr_spending": (float, 0.0),
+    "workplace_safety": (float, 0.0),
+    "emergency_preparedness": (float, 0.0),
+    "fin_reporting_freq": (str, "Never"),
+    "bir_income_tax": (str, None),
+    "has_policies": (bool, False),
+    "inspection_score": (float, 0.0),
+}
+SME_REQUIRED = ("business_name", "industry_sector", "region")
+
+# Usage text columns and the units compute_sme_score strips before float(), in the same order
+SME_USAGE_UNITS = {
+    "energy_usage": ("kwh",),
+    "water_usage": ("m3", "l"),
+    "ghg_emissions": ("kg CO2e",),
+}
+# Percentages and 0-100 scores, as bounded by the input form
+SME_PERCENT_FIELDS = ("pct_emp_health", "pct_emp_sss", "emp_turnover_rate",
+                      "workplace_safety", "emergency_preparedness", "inspection_score")
+
+SUPPLIER_FIELDS = {
+    "supplier_name": (str, None),
+    "supplier_sector": (str, None),
+    "supplier_region": (str, None),
+    "supplier_permit": (bool, False),
+}
+SUPPLIER_REQUIRED = ("supplier_name", "supplier_sector", "supplier_region")
+
+SME_COLUMNS = ["sme_id"] + list(SME_FIELDS)
+SUPPLIER_COLUMNS = ["sme_id"] + list(SUPPLIER_FIELDS)
+INSERT_SME_SQL = f"INSERT INTO sme ({', '.join(SME_COLUMNS)}) VALUES ({', '.join('?' * len(SME_COLUMNS))})"
+INSERT_SUPPLIER_SQL = f"INSERT INTO supplier ({', '.join(SUPPLIER_COLUMNS)}) VALUES ({', '.join('?' * len(SUPPLIER_COLUMNS))})"
+
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+FALSE_VALUES = {"0", "false", "no", "n", "f"}
+
+
+class RowError(Exception):
+    pass
+
+
+class ImportReport:
+    def __init__(self, kind):
+        self.kind = kind
+        self.read = 0
+        self.inserted = 0
+        self.suppliers_inserted = 0
+        self.screened = 0
+        self.errors = []  # (line_no, message)
+        self.name_to_id = {}  # business_name -> sme_id of inserted SMEs
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        lines = [
+            f"{self.kind}: read {self.read}, inserted {self.inserted}, rejected {len(self.errors)} "
+            f"in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+        ]
+        if self.suppliers_inserted:
+            lines.append(f"{self.kind}: inserted {self.suppliers_inserted} inline suppliers")
+        if self.screened:
+            lines.append(f"{self.kind}: screened {self.screened} suppliers against the watchlist")
+        for line_no, message in self.errors[:20]:
+            lines.append(f"  line {line_no}: {message}")
+        if len(self.errors) > 20:
+            lines.append(f"  ... {len(self.errors) - 20} more errors")
+        return "\n".join(lines)
+
+
+# Reading
+def read_records(path, fmt=None):
+    """Yield (line_no, record) for every row; record is an exception when the line cannot be parsed."""
+    fmt = fmt or ("jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv")
+    if fmt == "csv":
+        # Encoding detected like the watchlist csvs (Excel exports are often cp1252)
+        with open(path, "rb") as f:
+            reader, _ = open_csv(f)
+            for line_no, row in enumerate(reader, start=2):
+                yield line_no, row
+    elif fmt == "jsonl":
+        with open(path, encoding="utf-8-sig") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, e
+    else:
+        raise ValueError(f"Unknown import format {fmt!r}")
+
+# Validation
+def _parse(value, kind):
+    if kind is bool:
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise ValueError(f"expected a yes/no value, got {value!r}")
+    if kind is int:
+        return int(float(value))
+    if kind is float:
+        return float(value)
+    return str(value).strip()
+
+def _clean(record, fields, required):
+    row = {}
+    for name, (kind, default) in fields.items():
+        value = record.get(name)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if name in required:
+                raise RowError(f"missing {name}")
+            row[name] = default
+            continue
+        try:
+            row[name] = _parse(value, kind)
+        except (TypeError, ValueError) as e:
+            raise RowError(f"invalid {name}: {e}")
+    return row
+
+def _load_lookups(conn):
+    sectors = {s: (e + so + g) / 3 for s, e, so, g in conn.execute("SELECT sector, env_risk, soc_risk, gov_risk FROM esg_sector_risks")}
+    regions = dict(conn.execute("SELECT region, score FROM region_risks"))
+    return sectors, regions
+
+def _check_usage(name, value, units):
+    number = value
+    for unit in units:
+        number = number.replace(unit, "")
+    try:
+        float(number.strip())
+    except ValueError:
+        raise RowError(f"invalid {name}: expected a number with optional unit {units[0]!r}, got {value!r}")
+
+def validate_sme(record, sectors, regions):
+    row = _clean(record, SME_FIELDS, SME_REQUIRED)
+    for name, units in SME_USAGE_UNITS.items():
+        if row[name] is not None:
+            _check_usage(name, row[name], units)
+    for name in SME_PERCENT_FIELDS:
+        if not 0 <= row[name] <= 100:
+            raise RowError(f"invalid {name}: {row[name]} is not between 0 and 100")
+    if sectors and row["industry_sector"] not in sectors:
+        raise RowError(f"unknown industry_sector {row['industry_sector']!r}")
+    if regions and row["region"] not in regions:
+        raise RowError(f"unknown region {row['region']!r}")
+    # Same derived values the input form fills in
+    if row["sector_stability"] is None:
+        row["sector_stability"] = sectors.get(row["industry_sector"])
+    if row["location_hazard"] is None:
+        row["location_hazard"] = regions.get(row["region"])
+    return row
+
+def validate_supplier(record, sectors, regions):
+    row = _clean(record, SUPPLIER_FIELDS, SUPPLIER_REQUIRED)
+    if sectors and row["supplier_sector"] not in sectors:
+        raise RowError(f"unknown supplier_sector {row['supplier_sector']!r}")
+    if regions and row["supplier_region"] not in regions:
+        raise RowError(f"unknown supplier_region {row['supplier_region']!r}")
+    return row
+
+# Writing
+def _next_sme_id(conn):
+    # AUTOINCREMENT never reuses ids, so start past both the live rows and the sequence
+    max_id = conn.execute("SELECT MAX(sme_id) FROM sme").fetchone()[0] or 0
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'sme'").fetchone()
+    return max(max_id, seq[0] if seq else 0) + 1
+
+def _flush_smes(conn, smes, suppliers, report):
+    # Ids are handed out inside the write lock, so no other writer can take them
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        next_id = _next_sme_id(conn)
+        sme_rows, supplier_rows = [], []
+        for offset, (row, inline) in enumerate(zip(smes, suppliers)):
+            sme_id = next_id + offset
+            row["sme_id"] = sme_id
+            sme_rows.append(tuple(row[c] for c in SME_COLUMNS))
+            for sup in inline:
+                supplier_rows.append((sme_id, *(sup[c] for c in SUPPLIER_FIELDS)))
+        conn.executemany(INSERT_SME_SQL, sme_rows)
+        conn.executemany(INSERT_SUPPLIER_SQL, supplier_rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    report.inserted += len(sme_rows)
+    report.suppliers_inserted += len(supplier_rows)
+
+def _screen_suppliers(report, db_path):
+    # Imported suppliers are screened like the ones add_supplier writes, so scoring and the UI see
+    # their watchlist match right away (the pass also catches up on suppliers left stale before)
+    from utils.screening import rescreen_suppliers
+    report.screened = rescreen_suppliers(db_path=db_path)["changed"]
+
+def import_smes(path, fmt=None, batch_size=5000, db_path=None):
+    """
+    Stream SMEs (and inline suppliers) from a CSV or JSONL file into the sme and supplier tables.
+
+    Returns:
+        ImportReport with counts, rows/s, the rejected lines and the new ids in report.name_to_id
+    """
+    conn = get_connection(db_path)
+    sectors, regions = _load_lookups(conn)
+    report = ImportReport("sme")
+
+    smes, suppliers = [], []
+    for line_no, record in read_records(path, fmt):
+        report.read += 1
+        try:
+            if isinstance(record, Exception):
+                raise RowError(f"unreadable line: {record}")
+            row = validate_sme(record, sectors, regions)
+            inline = [validate_supplier(s, sectors, regions) for s in record.get("suppliers") or []]
+        except RowError as e:
+            report.errors.append((line_no, str(e)))
+            continue
+
+        smes.append(row)
+        suppliers.append(inline)
+        if len(smes) >= batch_size:
+            _flush_smes(conn, smes, suppliers, report)
+            report.name_to_id.update((r["business_name"], r["sme_id"]) for r in smes)
+            smes, suppliers = [], []
+
+    if smes:
+        _flush_smes(conn, smes, suppliers, report)
+        report.name_to_id.update((r["business_name"], r["sme_id"]) for r in smes)
+    if report.suppliers_inserted:
+        _screen_suppliers(report, db_path)
+    return report.finish()
+
+def import_suppliers(path, fmt=None, batch_size=5000, name_to_id=None, db_path=None):
+    """
+    Stream suppliers from a CSV or JSONL file. Each row names its SME by sme_id or sme_business_name;
+    names are resolved against name_to_id first (e.g. from import_smes) and then the sme table.
+    """
+    conn = get_connection(db_path)
+    sectors, regions = _load_lookups(conn)
+    name_to_id = dict(name_to_id or {})
+    report = ImportReport("supplier")
+
+    def resolve(record):
+        if record.get("sme_id") not in (None, ""):
+            sme_id = _parse(record["sme_id"], int)
+            if conn.execute("SELECT 1 FROM sme WHERE sme_id = ?", (sme_id,)).fetchone() is None:
+                raise RowError(f"sme_id {sme_id} does not exist")
+            return sme_id
+        name = str(record.get("sme_business_name") or "").strip()
+        if not name:
+            raise RowError("missing sme_id or sme_business_name")
+        if name not in name_to_id:
+            found = conn.execute("SELECT MAX(sme_id) FROM sme WHERE business_name = ?", (name,)).fetchone()[0]
+            if found is None:
+                raise RowError(f"no SME named {name!r}")
+            name_to_id[name] = found
+        return name_to_id[name]
+
+    from utils.scoring_utils import invalidate_scores
+    batch = []
+    def flush():
+        with conn:
+            conn.executemany(INSERT_SUPPLIER_SQL, batch)
+            invalidate_scores({row[0] for row in batch}, conn, db_path)
+        report.inserted += len(batch)
+        batch.clear()
+
+    for line_no, record in read_records(path, fmt):
+        report.read += 1
+        try:
+            if isinstance(record, Exception):
+                raise RowError(f"unreadable line: {record}")
+            sme_id = resolve(record)
+            row = validate_supplier(record, sectors, regions)
+        except (RowError, ValueError) as e:
+            report.errors.append((line_no, str(e)))
+            continue
+
+        batch.append((sme_id, *(row[c] for c in SUPPLIER_FIELDS)))
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    if report.inserted:
+        _screen_suppliers(report, db_path)
+    return report.finish()
+
+def write_error_report(reports, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["file", "line", "error"])
+        for report in reports:
+            for line_no, message in report.errors:
+                writer.writerow([report.kind, line_no, message])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import SMEs and suppliers from CSV or JSONL.")
+    parser.add_argument("smes", nargs="?", help="SME file (.csv or .jsonl)")
+    parser.add_argument("--suppliers", help="supplier file (.csv or .jsonl)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="force the input format")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--errors", help="write rejected lines to this CSV")
+    parser.add_argument("--db", help="database path (defaults to CLARITYESG_DB_PATH / esg_scoring.db)")
+    args = parser.parse_args(argv)
+
+    if not args.smes and not args.suppliers:
+        parser.error("nothing to import")
+    if args.db:
+        # Scoring reads the watchlist through the configured database
+        set_db_path(args.db)
+
+    reports = []
+    name_to_id = {}
+    if args.smes:
+        report = import_smes(args.smes, args.format, args.batch_size, args.db)
+        name_to_id = report.name_to_id
+        reports.append(report)
+        print(report.summary())
+    if args.suppliers:
+        report = import_suppliers(args.suppliers, args.format, args.batch_size, name_to_id, args.db)
+        reports.append(report)
+        print(report.summary())
+
+    # Score the new SMEs and the ones that got suppliers, so score listings include them right away
+    from utils.scoring_utils import fill_latest_scores
+    scored = fill_latest_scores(db_path=args.db, refresh=True)
+    print(f"Stored the latest score of {scored} SMEs")
+
+    if args.errors:
+        write_error_report(reports, args.errors)
+        print(f"Error report written to {args.errors}")
+    return 1 if any(r.errors for r in reports) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
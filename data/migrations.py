@@ -0,0 +1,371 @@
+import json
+from data.connection import get_connection
+
+# Versioned schema migrations.
+# Each migration runs once, in order, inside its own transaction and is recorded in schema_version.
+# Migrations must stay idempotent so a partially migrated database can always be re-run.
+
+def _has_cascade(conn, table):
+    fks = conn.execute(f"PRAGMA foreign_key_list({table})").fetchall()
+    return any(fk[2] == "sme" and fk[6] == "CASCADE" for fk in fks)
+
+def _has_column(conn, table, column):
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+def _has_table(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+def _real(value):
+    # Score of a stored JSON explanation, NaN as NULL
+    return None if value is None or value != value else float(value)
+
+def _m001_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_supplier_sme ON supplier(sme_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_sme_created ON audit_log(sme_id, created_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sme_business_name ON sme(business_name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sme_created_at ON sme(created_at)")
+
+def _m002_fk_cascades(conn):
+    # SQLite cannot alter a foreign key, so the child tables are rebuilt with ON DELETE CASCADE.
+    # Orphaned rows (left over from deleted SMEs) are dropped on the way.
+    if not _has_cascade(conn, "supplier"):
+        conn.execute("""
+            CREATE TABLE supplier_new(
+                supplier_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sme_id INTEGER NOT NULL,
+                supplier_name TEXT NOT NULL,
+                supplier_sector TEXT NOT NULL,
+                supplier_region TEXT NOT NULL,
+                supplier_permit BOOLEAN,
+                risk_tags TEXT,
+                FOREIGN KEY (sme_id) REFERENCES sme(sme_id) ON DELETE CASCADE
+            )
+        """)
+        conn.execute("""
+            INSERT INTO supplier_new (supplier_id, sme_id, supplier_name, supplier_sector, supplier_region, supplier_permit, risk_tags)
+            SELECT supplier_id, sme_id, supplier_name, supplier_sector, supplier_region, supplier_permit, risk_tags
+            FROM supplier WHERE sme_id IN (SELECT sme_id FROM sme)
+        """)
+        conn.execute("DROP TABLE supplier")
+        conn.execute("ALTER TABLE supplier_new RENAME TO supplier")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_supplier_sme ON supplier(sme_id)")
+
+    if not _has_cascade(conn, "audit_log"):
+        conn.execute("""
+            CREATE TABLE audit_log_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sme_id INTEGER,
+                explanation_json TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (sme_id) REFERENCES sme(sme_id) ON DELETE CASCADE
+            )
+        """)
+        conn.execute("""
+            INSERT INTO audit_log_new (id, sme_id, explanation_json, created_at)
+            SELECT id, sme_id, explanation_json, created_at
+            FROM audit_log WHERE sme_id IN (SELECT sme_id FROM sme)
+        """)
+        conn.execute("DROP TABLE audit_log")
+        conn.execute("ALTER TABLE audit_log_new RENAME TO audit_log")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_sme_created ON audit_log(sme_id, created_at, id)")
+
+def _m003_sme_fts(conn):
+    # External-content FTS5 index over sme.business_name, kept in sync by triggers
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS sme_fts USING fts5(
+            business_name,
+            content='sme',
+            content_rowid='sme_id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS sme_fts_ai AFTER INSERT ON sme BEGIN
+            INSERT INTO sme_fts(rowid, business_name) VALUES (new.sme_id, new.business_name);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS sme_fts_ad AFTER DELETE ON sme BEGIN
+            INSERT INTO sme_fts(sme_fts, rowid, business_name) VALUES ('delete', old.sme_id, old.business_name);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS sme_fts_au AFTER UPDATE OF business_name ON sme BEGIN
+            INSERT INTO sme_fts(sme_fts, rowid, business_name) VALUES ('delete', old.sme_id, old.business_name);
+            INSERT INTO sme_fts(rowid, business_name) VALUES (new.sme_id, new.business_name);
+        END
+    """)
+    conn.execute("INSERT INTO sme_fts(sme_fts) VALUES ('rebuild')")
+
+def _m004_sme_listing_indexes(conn):
+    # Keyset pagination: (filter column, sort key, sme_id) so every page is a single index range scan
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sme_sector_id ON sme(industry_sector, sme_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sme_region_id ON sme(region, sme_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sme_created_id ON sme(created_at, sme_id)")
+    conn.execute("DROP INDEX IF EXISTS idx_sme_created_at")
+
+def _m005_supplier_screening(conn):
+    # Screening results live in supplier.risk_tags (JSON), stamped with the watchlist version they were
+    # computed against. Every watchlist change bumps watchlist_meta.version and is logged in
+    # watchlist_changes, so stale suppliers can be re-screened against just the entries that changed.
+    if not _has_column(conn, "supplier", "screened_version"):
+        conn.execute("ALTER TABLE supplier ADD COLUMN screened_version INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_supplier_screened_version ON supplier(screened_version)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS watchlist_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            last_updated TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO watchlist_meta (id, version) VALUES (1, 1)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS watchlist_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            version INTEGER NOT NULL,
+            change TEXT NOT NULL CHECK (change IN ('added', 'removed')),
+            business_name TEXT NOT NULL,
+            risk_tag TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_watchlist_changes_version ON watchlist_changes(version)")
+
+def _m006_watchlist_sources(conn):
+    # Refreshes diff supplier_watchlist per source on the cleaned name, both stored on the row.
+    # Rows loaded before sources were tracked are attributed by their risk_tag: the SEC list has none,
+    # PhilGEPS offenses are stored as a dict string, everything else came from the BIR csv.
+    from utils.watchlist_index import clean_sme_name
+    if not _has_column(conn, "supplier_watchlist", "source"):
+        conn.execute("ALTER TABLE supplier_watchlist ADD COLUMN source TEXT")
+    if not _has_column(conn, "supplier_watchlist", "clean_name"):
+        conn.execute("ALTER TABLE supplier_watchlist ADD COLUMN clean_name TEXT")
+    conn.execute("""
+        UPDATE supplier_watchlist SET source = CASE
+            WHEN risk_tag IS NULL THEN 'sec'
+            WHEN risk_tag LIKE '{%' THEN 'philgeps'
+            ELSE 'bir' END
+        WHERE source IS NULL
+    """)
+    rows = conn.execute("SELECT supplier_watchlist_id, business_name FROM supplier_watchlist WHERE clean_name IS NULL").fetchall()
+    conn.executemany("UPDATE supplier_watchlist SET clean_name = ? WHERE supplier_watchlist_id = ?",
+                     [(clean_sme_name(str(name)), row_id) for row_id, name in rows])
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_supplier_watchlist_source_clean ON supplier_watchlist(source, clean_name)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS supplier_watchlist_staging (
+            staging_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            business_name TEXT NOT NULL,
+            risk_tag TEXT,
+            clean_name TEXT NOT NULL,
+            staged_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Staging is only ever filtered by source; the diff groups by clean_name in one sorted pass
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_supplier_watchlist_staging_src ON supplier_watchlist_staging(source)")
+
+def _m007_sec_scrape_checkpoints(conn):
+    # One row per scraper run and one per page it finished, so an interrupted run resumes where it stopped
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sec_scrape_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'done')),
+            max_pages INTEGER NOT NULL,
+            last_page INTEGER,
+            started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            finished_at TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sec_scrape_pages (
+            run_id INTEGER NOT NULL,
+            page INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            fetched_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, page),
+            FOREIGN KEY (run_id) REFERENCES sec_scrape_runs(run_id) ON DELETE CASCADE
+        )
+    """)
+
+def _m008_watchlist_staging_index(conn):
+    # Databases migrated to 6 before it created the staging index on source directly still have the
+    # (source, clean_name) one, which only slowed down every staged insert
+    conn.execute("DROP INDEX IF EXISTS idx_supplier_watchlist_staging_source")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_supplier_watchlist_staging_src ON supplier_watchlist_staging(source)")
+
+def _m009_audit_input_hash(conn):
+    # Audit rows are keyed on a hash of the scoring inputs, so the batched writer can upsert instead of
+    # reading the last explanation back. Rows written before have no hash (NULLs never conflict).
+    if not _has_column(conn, "audit_log", "input_hash"):
+        conn.execute("ALTER TABLE audit_log ADD COLUMN input_hash TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_log_sme_input_hash ON audit_log(sme_id, input_hash)")
+
+def _m010_sme_score_cache(conn):
+    # Retired: the score cache became sme_latest_score (11) before it shipped. The version is kept so
+    # databases that recorded it still apply 11 and 12.
+    pass
+
+def _m011_sme_latest_score(conn):
+    # Materialized latest score of every SME, with typed columns to sort and filter on, and the hash of
+    # the inputs it was computed from (see score_sme). Rows without input_hash (backfilled, batch-scored
+    # or invalidated) still list with their last known score, and score_sme recomputes them on the
+    # next view. SMEs scored before are backfilled by 12, from the typed audit_log columns.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sme_latest_score (
+            sme_id INTEGER PRIMARY KEY,
+            final_score REAL,
+            financial_score REAL,
+            environmental_score REAL,
+            social_score REAL,
+            gov_score REAL,
+            suppliers_score REAL,
+            input_hash TEXT,
+            explanation_json TEXT,
+            scored_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sme_id) REFERENCES sme(sme_id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sme_latest_score_final ON sme_latest_score(final_score, sme_id)")
+
+    # Databases that applied 10 while it still created sme_score_cache keep their cached scores.
+    # Explanations with NaN scores are not valid JSON to SQLite, their suppliers_score stays NULL
+    if _has_table(conn, "sme_score_cache"):
+        conn.execute("""
+            INSERT OR IGNORE INTO sme_latest_score (sme_id, final_score, financial_score, environmental_score, social_score,
+                                                    gov_score, suppliers_score, input_hash, explanation_json, scored_at)
+            SELECT sme_id, final_score, financial_score, environmental_score, social_score, gov_score,
+                   CASE WHEN json_valid(explanation_json) THEN json_extract(explanation_json, '$.suppliers_score') END,
+                   input_hash, explanation_json, computed_at
+            FROM sme_score_cache
+        """)
+        conn.execute("DROP TABLE sme_score_cache")
+
+def _m012_audit_columns(conn):
+    # Explanations move out of the JSON blob: scores into typed audit_log columns, supplier breakdowns
+    # into audit_supplier_detail. Backfilled in Python, json.dumps wrote NaN for unknown sector or
+    # region scores, which SQLite's JSON functions reject (stored as NULL here). The blobs are cleared
+    # afterwards (VACUUM to give the space back).
+    score_columns = ("financial_score", "environmental_score", "social_score", "governance_score",
+                     "base_score", "suppliers_score", "final_score")
+    detail_columns = ("name_score", "sector_score", "region_score", "permit_score", "final_supplier_score")
+
+    for column in score_columns:
+        if not _has_column(conn, "audit_log", column):
+            conn.execute(f"ALTER TABLE audit_log ADD COLUMN {column} REAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS audit_supplier_detail (
+            audit_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            supplier_name TEXT,
+            name_score REAL,
+            sector_score REAL,
+            region_score REAL,
+            permit_score REAL,
+            final_supplier_score REAL,
+            PRIMARY KEY (audit_id, position),
+            FOREIGN KEY (audit_id) REFERENCES audit_log(id) ON DELETE CASCADE
+        )
+    """)
+
+    rows = conn.execute("SELECT id, explanation_json FROM audit_log WHERE explanation_json IS NOT NULL").fetchall()
+    updates, details = [], []
+    for audit_id, blob in rows:
+        explanation = json.loads(blob)
+        updates.append((*[_real(explanation.get(c)) for c in score_columns], audit_id))
+        for position, supplier in enumerate(explanation.get("suppliers_detail") or []):
+            details.append((audit_id, position, supplier.get("supplier_name"),
+                            *[_real(supplier.get(c)) for c in detail_columns]))
+    conn.executemany(f"""
+        UPDATE audit_log SET {', '.join(f'{c} = ?' for c in score_columns)}, explanation_json = NULL
+        WHERE id = ?
+    """, updates)
+    conn.executemany(f"""
+        INSERT OR REPLACE INTO audit_supplier_detail (audit_id, position, supplier_name, {', '.join(detail_columns)})
+        VALUES (?, ?, ?, {', '.join('?' * len(detail_columns))})
+    """, details)
+
+    # SMEs without a latest score start from their latest audit row, which only has gov_score with
+    # the policy bonus added
+    conn.execute("""
+        INSERT OR IGNORE INTO sme_latest_score (sme_id, final_score, financial_score, environmental_score, social_score,
+                                                gov_score, suppliers_score, scored_at)
+        SELECT a.sme_id, a.final_score, a.financial_score, a.environmental_score, a.social_score,
+               a.governance_score - COALESCE(s.has_policies, 0), a.suppliers_score, a.created_at
+        FROM sme s
+        JOIN audit_log a ON a.id = (SELECT id FROM audit_log WHERE sme_id = s.sme_id ORDER BY created_at DESC, id DESC LIMIT 1)
+    """)
+
+def _m013_watchlist_screened_through(conn):
+    # A re-screen pass rewrites only the results it changed and records the version it covered once,
+    # see utils/screening.rescreen_suppliers
+    if not _has_column(conn, "watchlist_meta", "screened_through"):
+        conn.execute("ALTER TABLE watchlist_meta ADD COLUMN screened_through INTEGER NOT NULL DEFAULT 0")
+
+def _m014_watchlist_sources(conn):
+    # sha256 of the payload each watchlist source was last ingested from, kept with the rows it went
+    # into so a new database at the same path starts empty
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS watchlist_sources (
+            source TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            ingested_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+# (version, name, function), keep ordered and never renumber
+MIGRATIONS = [
+    (1, "indexes on supplier, audit_log and sme", _m001_indexes),
+    (2, "foreign key cascades on supplier and audit_log", _m002_fk_cascades),
+    (3, "fts5 search index on sme.business_name", _m003_sme_fts),
+    (4, "keyset listing indexes on sme", _m004_sme_listing_indexes),
+    (5, "supplier screening results and watchlist versioning", _m005_supplier_screening),
+    (6, "watchlist sources, cleaned names and staging table", _m006_watchlist_sources),
+    (7, "sec scraper run and page checkpoints", _m007_sec_scrape_checkpoints),
+    (8, "lighter watchlist staging index", _m008_watchlist_staging_index),
+    (9, "audit_log input hash", _m009_audit_input_hash),
+    (10, "persistent sme score cache", _m010_sme_score_cache),
+    (11, "materialized latest score per sme", _m011_sme_latest_score),
+    (12, "typed audit_log scores and supplier detail table", _m012_audit_columns),
+    (13, "watchlist screened_through version", _m013_watchlist_screened_through),
+    (14, "ingested watchlist source payloads", _m014_watchlist_sources),
+]
+
+def init_schema_version(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    conn.commit()
+
+def current_version(conn):
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def migrate(db_path=None):
+    """Apply all pending migrations and return the resulting schema version."""
+    conn = get_connection(db_path)
+    init_schema_version(conn)
+    version = current_version(conn)
+    pending = [m for m in MIGRATIONS if m[0] > version]
+    if not pending:
+        return version
+
+    # foreign_keys cannot be toggled inside a transaction, and table rebuilds need it off
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        for version, name, func in pending:
+            conn.execute("BEGIN")
+            try:
+                func(conn)
+                conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"✅ Applied migration {version}: {name}")
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+    return version
@@ -0,0 +1,286 @@
+"""
+Watchlist refresh pipeline.
+
+Each source (the BIR csv, the PhilGEPS blacklist, the SEC suspended list) is refreshed from a new
+snapshot instead of being inserted blindly:
+
+    1. the snapshot is written to supplier_watchlist_staging (scrapers can stream into it page by page)
+    2. it is diffed against the current rows of that source on the cleaned business name and risk tag
+    3. only the inserts and deletes are applied, in one transaction that also bumps watchlist_meta
+       (version and last_updated) and logs the changes for incremental supplier re-screening
+
+Running processes pick up the new version on their next check_supplier call and swap in a rebuilt
+matcher index (see utils/scoring_utils.py).
+
+Usage:
+    python -m data.watchlist [bir|philgeps|sec|all] [--no-rescreen]
+"""
+import argparse
+import sys
+import time
+
+from data.connection import get_connection
+from data.csv_stream import open_csv
+from data.database import bump_watchlist_version, get_watchlist_version
+from utils.watchlist_index import clean_sme_name
+
+SOURCES = ("bir", "philgeps", "sec")
+BIR_CSV = "data/csvs/bir_rate2.csv"
+STAGE_BATCH_SIZE = 10_000
+
+# Staging
+def clear_staging(source, conn=None):
+    conn = conn or get_connection()
+    conn.execute("DELETE FROM supplier_watchlist_staging WHERE source = ?", (source,))
+    conn.commit()
+
+def stage_rows(source, records, conn=None, commit=True, batch_size=STAGE_BATCH_SIZE):
+    """
+    Append (business_name, risk_tag) records to the staging snapshot of a source, returns how many were staged.
+
+    records can be any iterable, it is consumed and inserted batch_size rows at a time so memory stays
+    flat on large files. Names are cleaned once here and the clean_name is kept from then on.
+    commit=False leaves the rows in the caller's transaction (the SEC scraper commits them with its page checkpoint).
+    """
+    conn = conn or get_connection()
+    staged = 0
+    batch = []
+
+    def flush():
+        conn.executemany(
+            "INSERT INTO supplier_watchlist_staging (source, business_name, risk_tag, clean_name) VALUES (?, ?, ?, ?)", batch
+        )
+        return len(batch)
+
+    for business_name, risk_tag in records:
+        if business_name is None or not str(business_name).strip():
+            continue
+        business_name = str(business_name).strip()
+        batch.append((source, business_name, None if risk_tag is None else str(risk_tag), clean_sme_name(business_name)))
+        if len(batch) >= batch_size:
+            staged += flush()
+            batch = []
+    if batch:
+        staged += flush()
+    if commit:
+        conn.commit()
+    return staged
+
+def ingested_sha256(source, conn=None):
+    """sha256 of the payload source was last ingested from, None when the database has no rows of it."""
+    conn = conn or get_connection()
+    row = conn.execute("""
+        SELECT sha256 FROM watchlist_sources
+        WHERE source = ? AND EXISTS (SELECT 1 FROM supplier_watchlist WHERE source = ?)
+    """, (source, source)).fetchone()
+    return row[0] if row else None
+
+def mark_ingested(source, sha256, conn=None):
+    conn = conn or get_connection()
+    conn.execute("""
+        INSERT INTO watchlist_sources (source, sha256) VALUES (?, ?)
+        ON CONFLICT(source) DO UPDATE SET sha256 = excluded.sha256, ingested_at = CURRENT_TIMESTAMP
+    """, (source, sha256))
+    conn.commit()
+
+def staged_count(source, conn=None):
+    conn = conn or get_connection()
+    return conn.execute("SELECT COUNT(*) FROM supplier_watchlist_staging WHERE source = ?", (source,)).fetchone()[0]
+
+# Diff and apply
+#
+# The diff runs in SQL so neither snapshot has to fit in memory. Rows are keyed by cleaned name and
+# risk_tag, so every distinct offense of a business is its own entry:
+#   _staged  the first staged row of every (clean_name, risk_tag)
+#   _kept    per (clean_name, risk_tag), the first current row identical to the staged one
+# Every other current row is deleted (changed, gone, or a duplicate left by the old insert-only
+# loaders) and every staged row without a kept counterpart is inserted.
+def _build_diff(conn, source):
+    conn.execute("DROP TABLE IF EXISTS temp._staged")
+    conn.execute("DROP TABLE IF EXISTS temp._kept")
+    # SQLite takes the bare columns of a MIN() aggregate from the row holding the minimum
+    conn.execute("""
+        CREATE TEMP TABLE _staged AS
+        SELECT business_name, risk_tag, clean_name, MIN(staging_id) AS first_id
+        FROM supplier_watchlist_staging
+        WHERE source = ?
+        GROUP BY clean_name, risk_tag
+    """, (source,))
+    conn.execute("CREATE UNIQUE INDEX temp._staged_key ON _staged(clean_name, risk_tag)")
+    conn.execute("""
+        CREATE TEMP TABLE _kept AS
+        SELECT MIN(w.supplier_watchlist_id) AS supplier_watchlist_id, w.clean_name, w.risk_tag
+        FROM supplier_watchlist w
+        JOIN _staged s ON s.clean_name = w.clean_name AND s.risk_tag IS w.risk_tag AND s.business_name = w.business_name
+        WHERE w.source = ?
+        GROUP BY w.clean_name, w.risk_tag
+    """, (source,))
+    conn.execute("CREATE UNIQUE INDEX temp._kept_id ON _kept(supplier_watchlist_id)")
+    conn.execute("CREATE UNIQUE INDEX temp._kept_key ON _kept(clean_name, risk_tag)")
+
+DELETES_SQL = """
+    FROM supplier_watchlist WHERE source = ? AND supplier_watchlist_id NOT IN (SELECT supplier_watchlist_id FROM _kept)
+"""
+INSERTS_SQL = """
+    FROM _staged s WHERE NOT EXISTS (SELECT 1 FROM _kept k WHERE k.clean_name = s.clean_name AND k.risk_tag IS s.risk_tag)
+"""
+
+def diff_staged(source, conn=None):
+    """
+    Compare the staged snapshot of a source with its current rows, without changing anything.
+
+    Returns:
+        (inserts, deletes) as lists of (business_name, risk_tag, clean_name) and (supplier_watchlist_id, business_name, risk_tag)
+    """
+    conn = conn or get_connection()
+    _build_diff(conn, source)
+    inserts = conn.execute("SELECT business_name, risk_tag, clean_name" + INSERTS_SQL).fetchall()
+    deletes = conn.execute("SELECT supplier_watchlist_id, business_name, risk_tag" + DELETES_SQL, (source,)).fetchall()
+    return inserts, deletes
+
+def apply_staged(source, conn=None):
+    """
+    Apply the staged snapshot of a source in one transaction and clear the staging rows.
+
+    An empty snapshot is refused rather than wiping the source (a failed fetch looks the same).
+
+    Returns:
+        dict with source, inserted, deleted, unchanged and version (unchanged when nothing differed)
+    """
+    conn = conn or get_connection()
+    if not staged_count(source, conn):
+        raise ValueError(f"Nothing staged for watchlist source {source!r}")
+
+    # The diff tables scale with the snapshot, keep them in a temp file rather than in memory
+    conn.execute("PRAGMA temp_store=FILE")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _build_diff(conn, source)
+        deleted = conn.execute("SELECT COUNT(*)" + DELETES_SQL, (source,)).fetchone()[0]
+        inserted = conn.execute("SELECT COUNT(*)" + INSERTS_SQL).fetchone()[0]
+        total = conn.execute("SELECT COUNT(*) FROM supplier_watchlist WHERE source = ?", (source,)).fetchone()[0]
+        if inserted or deleted:
+            # Change log for rescreen_suppliers, written straight from the diff
+            version = bump_watchlist_version(conn)
+            conn.execute("INSERT INTO watchlist_changes (version, change, business_name, risk_tag) "
+                         "SELECT ?, 'removed', business_name, risk_tag" + DELETES_SQL, (version, source))
+            conn.execute("DELETE" + DELETES_SQL, (source,))
+            conn.execute("INSERT INTO watchlist_changes (version, change, business_name, risk_tag) "
+                         "SELECT ?, 'added', business_name, risk_tag" + INSERTS_SQL, (version,))
+            conn.execute("INSERT INTO supplier_watchlist (business_name, risk_tag, source, clean_name) "
+                         "SELECT business_name, risk_tag, ?, clean_name" + INSERTS_SQL + " ORDER BY first_id", (source,))
+        conn.execute("DELETE FROM supplier_watchlist_staging WHERE source = ?", (source,))
+        conn.execute("DROP TABLE temp._staged")
+        conn.execute("DROP TABLE temp._kept")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA temp_store=MEMORY")
+
+    return {
+        "source": source,
+        "inserted": inserted,
+        "deleted": deleted,
+        "unchanged": total - deleted,
+        "version": get_watchlist_version(conn),
+    }
+
+# Sources: fetched through the conditional-fetch cache (utils/fetch_cache.py), parsers read the
+# payload from a binary file object and yield (business_name, risk_tag) records
+def parse_bir(f, encoding=None):
+    # Streamed row by row, the encoding is detected (bir_rate2.csv itself is cp1252)
+    reader, _ = open_csv(f, encoding)
+    for row in reader:
+        yield row["BUSINESS_NAME"], row["RISK_TAG"]
+
+def parse_philgeps(f):
+    from utils.ai_utils import parse_philgeps as parse_philgeps_df
+    return parse_philgeps_df(f.read())[["BUSINESS_NAME", "RISK_TAG"]].itertuples(index=False, name=None)
+
+def philgeps_url():
+    from utils.ai_utils import PHILGEPS_URL
+    return PHILGEPS_URL
+
+def scrape_sec():
+    # The SEC scraper streams its pages into staging itself and resumes an interrupted run
+    from utils.sec_scraper import SecScraper
+    SecScraper().run()
+
+# source -> (location returning a url or path, parser of the raw payload into (business_name, risk_tag) records)
+SOURCE_LOADERS = {"bir": (lambda: BIR_CSV, parse_bir), "philgeps": (philgeps_url, parse_philgeps)}
+STAGING_SCRAPERS = {"sec": scrape_sec}
+
+def refresh_watchlist(source, records=None, rescreen=True, force=False, location=None, warm=True):
+    """
+    Stage a fresh snapshot of one source (fetched with its loader unless records are given), apply
+    the diff, then re-screen suppliers affected by it and warm this process's matcher index.
+
+    Fetched sources are skipped without parsing when their payload is the one this database last
+    ingested (see ingested_sha256), unless force=True. location overrides the source's url or file path, and warm=False
+    skips rebuilding this process's matcher index (for one-off CLI runs).
+    """
+    if source not in SOURCES:
+        raise ValueError(f"Unknown watchlist source {source!r}, expected one of {SOURCES}")
+    fetched = None
+    if records is None and source in STAGING_SCRAPERS:
+        STAGING_SCRAPERS[source]()
+    else:
+        if records is None:
+            from utils.fetch_cache import fetch_source
+            default_location, parser = SOURCE_LOADERS[source]
+            fetched = fetch_source(source, location or default_location(), force=force)
+            if not force and fetched.sha256 == ingested_sha256(source):
+                return {"source": source, "inserted": 0, "deleted": 0, "unchanged": None,
+                        "version": get_watchlist_version(), "skipped": True}
+            clear_staging(source)
+            start = time.perf_counter()
+            with fetched.open() as f:
+                staged = stage_rows(source, parser(f))
+            fetched.record_parse(time.perf_counter() - start, staged)
+        else:
+            clear_staging(source)
+            stage_rows(source, records)
+
+    stats = publish_staged(source, rescreen, warm)
+    if fetched is not None:
+        mark_ingested(source, fetched.sha256)
+    return stats
+
+def publish_staged(source, rescreen=True, warm=True, db_path=None):
+    """
+    Apply the staged snapshot of a source, then warm this process's matcher index and re-screen suppliers.
+
+    db_path selects the database (the default one when None); warm only applies to the default one,
+    which is the one this process's matcher index reads.
+    """
+    stats = apply_staged(source, get_connection(db_path))
+    if stats["inserted"] or stats["deleted"]:
+        if warm:
+            from utils.scoring_utils import refresh_watchlist_index
+            refresh_watchlist_index()
+        if rescreen:
+            from utils.screening import rescreen_suppliers
+            stats["rescreened"] = rescreen_suppliers(db_path=db_path)["changed"]
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh supplier_watchlist sources.")
+    parser.add_argument("source", nargs="?", default="all", choices=SOURCES + ("all",))
+    parser.add_argument("--no-rescreen", action="store_true", help="leave supplier screening results for later")
+    parser.add_argument("--force", action="store_true", help="download and apply even if the source did not change")
+    args = parser.parse_args(argv)
+
+    for source in SOURCES if args.source == "all" else (args.source,):
+        start = time.perf_counter()
+        stats = refresh_watchlist(source, rescreen=not args.no_rescreen, force=args.force, warm=False)
+        if stats.get("skipped"):
+            print(f"⏭️ {source}: unchanged since the last refresh, skipped")
+            continue
+        print(f"✅ {source}: +{stats['inserted']} -{stats['deleted']} ({stats['unchanged']} unchanged), "
+              f"watchlist version {stats['version']} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,10 @@
 import streamlit as st
-from data.database import get_all_smes, search_name
+from data.database import list_smes, get_sme_filters, search_name
 from utils.scoring_utils import score_sme
 
+PAGE_SIZE = 20
+# Score sorting and filtering run in SQL on sme_latest_score
+SORT_OPTIONS = {"Oldest first": "sme_id", "Newest first": "created_at", "Riskiest first": "score", "Safest first": "score_desc"}
 
 hide_sidebar_style = """
     <style>
@@ -34,10 +37,6 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-@st.cache_data(ttl=120, show_spinner=False)
-def cached_score_sme(sme_id, industry_sector, region):
-    return score_sme(sme_id, industry_sector, region)
-
 def render_card(sme_id, business_name, industry_sector, region, risk_score, f_score, e_score, s_score, g_score, created_at):
     bg_color = st.get_option("theme.backgroundColor")
     st.markdown(
@@ -198,13 +197,21 @@ def render_card(sme_id, business_name, industry_sector, region, risk_score, f_sc
     """)
 
 # Search and Display
-if search_btn and search_field.strip():
-    name_of_sme = search_field.strip()
-    search_results = search_name(name_of_sme)
+if search_btn:
+    st.session_state.search_term = search_field.strip()
+    st.session_state.search_page = 0
+
+search_term = st.session_state.get("search_term", "")
+if search_term:
+    search_page = st.session_state.get("search_page", 0)
+    # Fetch one extra row to know whether there is a next page
+    search_results = search_name(search_term, limit=PAGE_SIZE + 1, offset=search_page * PAGE_SIZE)
+    has_next = len(search_results) > PAGE_SIZE
+    search_results = search_results[:PAGE_SIZE]
 
     if search_results:
         for i, (sme_id, business_name, industry_sector, region, created_at) in enumerate(search_results, start=1):
-            risk_score, f_score, e_score, s_score, g_score, _ = cached_score_sme(
+            risk_score, f_score, e_score, s_score, g_score, _ = score_sme(
                 sme_id, industry_sector, region)
             render_card(sme_id, business_name, industry_sector,
                         region, round(risk_score, 2), round(f_score, 2), round(e_score, 2), round(s_score, 2), round(g_score, 2), created_at)
@@ -214,13 +221,43 @@ if search_btn and search_field.strip():
                 """,
                 unsafe_allow_html=True
              )
+
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        if search_page > 0 and prev_col.button("Previous"):
+            st.session_state.search_page -= 1
+            st.rerun()
+        page_col.caption(f"Page {search_page + 1}")
+        if has_next and next_col.button("Next"):
+            st.session_state.search_page = search_page + 1
+            st.rerun()
     else:
         st.info("Name searched does not exist.")
 else:
-    smes = get_all_smes()
+    sectors, regions = get_sme_filters()
+    filter_cols = st.columns(4)
+    sector_filter = filter_cols[0].selectbox("Filter by sector", ["All"] + sectors)
+    region_filter = filter_cols[1].selectbox("Filter by region", ["All"] + regions)
+    sort_label = filter_cols[2].selectbox("Sort by", list(SORT_OPTIONS))
+    score_range = filter_cols[3].slider("ESG score", 0, 100, (0, 100))
+    filters = (sector_filter, region_filter, sort_label, score_range)
+
+    # Stack of keyset cursors, one per page visited; reset when the filters change
+    if st.session_state.get("list_filters") != filters:
+        st.session_state.list_filters = filters
+        st.session_state.list_cursors = [None]
+
+    smes, next_cursor = list_smes(
+        cursor=st.session_state.list_cursors[-1],
+        limit=PAGE_SIZE,
+        sector=None if sector_filter == "All" else sector_filter,
+        region=None if region_filter == "All" else region_filter,
+        order_by=SORT_OPTIONS[sort_label],
+        min_score=None if score_range[0] == 0 else score_range[0],
+        max_score=None if score_range[1] == 100 else score_range[1],
+    )
     if smes:
         for i, (sme_id, business_name, industry_sector, region, created_at) in enumerate(smes, start=1):
-            risk_score, f_score, e_score, s_score, g_score, _ = cached_score_sme(
+            risk_score, f_score, e_score, s_score, g_score, _ = score_sme(
                 sme_id, industry_sector, region)
             render_card(sme_id, business_name, industry_sector,
                         region, round(risk_score, 2), round(f_score, 2), round(e_score, 2), round(s_score, 2), round(g_score, 2), created_at)
@@ -230,5 +267,14 @@ else:
                 """,
                 unsafe_allow_html=True
              )
+
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        if len(st.session_state.list_cursors) > 1 and prev_col.button("Previous"):
+            st.session_state.list_cursors.pop()
+            st.rerun()
+        page_col.caption(f"Page {len(st.session_state.list_cursors)}")
+        if next_cursor is not None and next_col.button("Load more"):
+            st.session_state.list_cursors.append(next_cursor)
+            st.rerun()
     else:
         st.info("No SME Data yet")
@@ -52,8 +52,8 @@ def ai_utils():
     return supply_chain_map
 
 def scoring_utils():
-    from utils.scoring_utils import check_supplier, sector_risk_avg, region_risk, normalize, score_sme
-    return check_supplier, sector_risk_avg, region_risk, normalize, score_sme
+    from utils.scoring_utils import score_suppliers, score_sme
+    return score_suppliers, score_sme
 
 def report_utils():
     from utils.report_utils import load_latest_explanation, load_sme_record, build_pdf, save_scores_chart, save_supply_chain_graph
@@ -101,7 +101,7 @@ else:
     industry_sector = smes_df["industry_sector"].iloc[0]
     region = smes_df["region"].iloc[0]
 
-    check_supplier, sector_risk_avg, region_risk, normalize, score_sme = scoring_utils()
+    score_suppliers, score_sme = scoring_utils()
     final_score, f_score, e_score, s_score, g_score, explanation = score_sme(
         sme_id, industry_sector, region
     )
@@ -367,26 +367,13 @@ else:
             """,
             unsafe_allow_html=True
         )
-        for _, row in suppliers_df.iterrows():
+        for row in score_suppliers(sme_id):
             supplier_id = int(row['supplier_id'])
             supplier_name = row['supplier_name']
             supplier_sector = row['supplier_sector']
             supplier_region = row['supplier_region']
-            supplier_permit = row['supplier_permit']
             id_of_sme = row['sme_id']
-
-            # Higher is better: check_supplier returns 0.0–1.0; multiply by 100 before inverting
-            name_score = abs(float(check_supplier(str(supplier_name))) * 100 - 100)
-
-            sector_df = sector_risk_avg(str(supplier_sector))
-            sector_score = abs(normalize(float(sector_df["avg_score"].iloc[0]), 0, 10) - 100)
-
-            region_df = region_risk(str(supplier_region))
-            region_score = float(region_df["score"].iloc[0])
-
-            permit_score = 100 if int(supplier_permit) == 1 else 50
-
-            final_score = (name_score + sector_score + region_score + permit_score) / 4
+            final_score = row['final_supplier_score']
 
             # Risk badge for supplier (higher score = lower risk)
             if final_score >= 71:
@@ -443,8 +430,8 @@ with open(html_path, 'r', encoding="utf-8") as f:
 components.html(html_content, height=512, scrolling=True)
 
 # Time Series audit score graph
-audit_df = get_audit_score(sme_id)
-audit_df = audit_df.sort_values(by="created_at", ascending=True).iloc[0:10]
+audit_df = get_audit_score(sme_id, limit=10)
+audit_df = audit_df.sort_values(by="created_at", ascending=True)
 
 plt.figure(figsize=(8, 4))
 
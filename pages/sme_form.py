@@ -4,8 +4,8 @@ from data.database import temp_insert_sme, save_to_uploads, update_sme_files
 
 
 def ai_utils2():
-    from utils.ai_utils import get_text_from_file, generate_summary
-    return get_text_from_file, generate_summary
+    from utils.document_analysis import analyze_documents
+    return analyze_documents
 
 def scoring_utils2():
     from utils.scoring_utils import sector_risk_avg, region_risk
@@ -26,7 +26,7 @@ hide_sidebar_style = """
 """
 st.markdown(hide_sidebar_style, unsafe_allow_html=True)
 
-get_text_from_file, generate_summary = ai_utils2()
+analyze_documents = ai_utils2()
 
 # Initialize Session State
 if "sme_step" not in st.session_state:
@@ -165,15 +165,8 @@ elif st.session_state.sme_step == 2:
             with st.spinner("AI is analyzing your documents..."):
                 has_bcp = True if bcp is not None else False
 
-                profit_score = 0
-                if audited_financial_statement is not None:
-                    audited_financial_statement.seek(0)
-                    ocr_result = get_text_from_file(audited_financial_statement, file_type="application/pdf")
-
-                    # Join all pages for complete document analysis
-                    full_text = "\n".join(p["text"] for p in ocr_result["pages"])
-
-                    prompt = f"""
+                results = analyze_documents({
+                    "profit": (audited_financial_statement, """
                         Extracted Text: {full_text}
 
                         Extract all visible text and tables from the SME's income statement or audited financial
@@ -195,19 +188,8 @@ elif st.session_state.sme_step == 2:
                         After all this, please only display this:
                         If company is profitable based on your analysis, display a simple '1' only!!!
                         else if breakeven or running at a loss display a simple '0' only!!!
-                    """
-
-                    profit_score = generate_summary(prompt)
-
-                energy_usage = ""
-                if utility_bill is not None:
-                    utility_bill.seek(0)
-                    ocr_result = get_text_from_file(utility_bill, file_type="application/pdf")
-
-                    # Join all pages for complete document analysis
-                    full_text = "\n".join(p["text"] for p in ocr_result["pages"])
-
-                    prompt = f"""
+                    """),
+                    "energy": (utility_bill, """
                     Extracted text:{full_text}
 
                     You are going to analyze the extracted texts from a utility bill in the context of a Philippine SME.
@@ -215,20 +197,9 @@ elif st.session_state.sme_step == 2:
 
                     (kwh from extracted text) where kwh is all small letters
                     if you cannot properly find one, simply display 0 only!!
-                    """
-                    energy_usage = generate_summary(prompt)
-
-                water_usage = ""
-
-                if water_bill is not None:
-                    water_bill.seek(0)
-                    ocr_result_two = get_text_from_file(water_bill, file_type="application/pdf")
-
-                    # Join all pages for complete document analysis
-                    full_text_water = "\n".join(p["text"] for p in ocr_result_two["pages"])
-
-                    prompt = f"""
-                    Extracted text:{full_text_water}
+                    """),
+                    "water": (water_bill, """
+                    Extracted text:{full_text}
 
                     Analyze the water bill and extract all visible text with exact formatting, including account details,
                     billing period, consumption volume, and cost breakdown. Identify total water consumption in cubic meters (m³)
@@ -245,8 +216,11 @@ elif st.session_state.sme_step == 2:
                         e.g. 17 m3, 90 l, etc.
 
                         if no m3 or liters simply display "0" only!!
-                    """
-                    water_usage = generate_summary(prompt)
+                    """),
+                })
+                profit_score = results.get("profit", 0)
+                energy_usage = results.get("energy", "")
+                water_usage = results.get("water", "")
 
                 # Safely parse profit score from AI response
                 try:
@@ -308,15 +282,8 @@ elif st.session_state.sme_step == 3:
 
             else:
                 with st.spinner("AI is analyzing your documents..."):
-                    ws_score = 0
-                    if workplace_safety is not None:
-                        workplace_safety.seek(0)
-                        ocr_result = get_text_from_file(workplace_safety, file_type="application/pdf")
-
-                        # Join all pages for complete document analysis
-                        full_text = "\n".join(p["text"] for p in ocr_result["pages"])
-
-                        prompt = f"""
+                    results = analyze_documents({
+                        "workplace_safety": (workplace_safety, """
                         Extracted text:{full_text}
 
                         Extract all visible text from the workplace safety document with exact formatting,
@@ -336,19 +303,8 @@ elif st.session_state.sme_step == 3:
                             documents, and if the contents are aligned or not.
 
                             e.g. (100, 87.5, 7.75, 32, 89, etc.)
-                        """
-
-                        ws_score = generate_summary(prompt)
-
-                    ep_score = 0
-                    if emergency_preparedness is not None:
-                        emergency_preparedness.seek(0)
-                        ocr_result = get_text_from_file(emergency_preparedness, file_type="application/pdf")
-
-                        # Join all pages for complete document analysis
-                        full_text = "\n".join(p["text"] for p in ocr_result["pages"])
-
-                        prompt = f"""
+                        """),
+                        "emergency_preparedness": (emergency_preparedness, """
                         Extracted text:{full_text}
 
                         Extract all visible text from the emergency preparedness document with exact formatting,
@@ -369,9 +325,10 @@ elif st.session_state.sme_step == 3:
                             the contents are aligned or not.
 
                             e.g. (100, 87.5, 7.75, 32, 89, etc.)
-                        """
-
-                        ep_score = generate_summary(prompt)
+                        """),
+                    })
+                    ws_score = results.get("workplace_safety", 0)
+                    ep_score = results.get("emergency_preparedness", 0)
 
                     st.session_state.sme_data.update({
                         "pct_emp_health": pct_emp_health,
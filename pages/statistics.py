@@ -1,8 +1,8 @@
-import sqlite3
 import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
 import seaborn as sns
+from data.connection import get_connection
 
 # Explicit region groupings — avoids fragile iloc index slicing
 LUZON_REGIONS = [
@@ -33,16 +33,14 @@ MINDANAO_REGIONS = [
 
 
 def sector_risk_avg():
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     df = pd.read_sql("SELECT * FROM esg_sector_risks", conn)
-    conn.close()
     df["avg_score"] = (df["env_risk"] + df["soc_risk"] + df["gov_risk"]) / 3
     return df
 
 def region_risk():
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     df = pd.read_sql("SELECT * FROM region_risks", conn)
-    conn.close()
     return df
 
 # UI
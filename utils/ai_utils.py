@@ -1,14 +1,15 @@
 import fitz
-import sqlite3
-import requests
 import pandas as pd
-import time, random
-import io, base64, os
+import io, os, json
+import random
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from pathlib import Path
-from bs4 import BeautifulSoup
 from pyvis.network import Network
+from data.connection import get_connection
 
 def get_openai_client():
     try:
@@ -31,23 +32,40 @@ def get_openai_client():
     return OpenAI(api_key=api_key)
 
 # ==========================
-def encode_image(pil_image):
-    buf = io.BytesIO()
-    pil_image.save(buf, format="JPEG")
-    return base64.b64encode(buf.getvalue()).decode("utf-8")
+# OCR. Results are cached per page in utils/ocr_cache.py under the file's sha256, so bump
+# OCR_PROMPT_VERSION whenever the prompt, the model or the image preparation (utils/image_prep.py) changes.
+OCR_MODEL = "gpt-4o"
+OCR_PROMPT = ("Extract all visible text from the image with exact formatting, including numbers, tables, special characters, "
+              "and structured data such as ESG metrics, financial figures, business KPIs, charts, and labels; if graphs or dashboards are present, interpret "
+              "and summarize key business insights, ESG indicators, and financial or operational risks for audit and reporting; if no text exists, describe "
+              "the layout, document type, visual elements, and any business context or branding relevant to SME ESG lender analysis and automated due diligence.")
+OCR_PROMPT_VERSION = 2
+OCR_CONCURRENCY = int(os.environ.get("CLARITYESG_OCR_CONCURRENCY", 4))   # vision requests in flight per document
+OCR_MAX_RETRIES = 3         # per page, on rate limits, timeouts and 5xx
+OCR_BACKOFF_BASE = 1.0
+OCR_BACKOFF_CAP = 20.0
+
+# PDF text layer. A page whose embedded text passes these checks is read locally (PyMuPDF text and
+# tables) instead of being sent to the vision model
+OCR_TEXT_LAYER = os.environ.get("CLARITYESG_OCR_TEXT_LAYER", "1") != "0"
+TEXT_LAYER_MIN_CHARS = 40               # non-whitespace characters
+TEXT_LAYER_MIN_ALNUM = 0.5              # share of letters and digits among them (broken font encodings fail this)
+TEXT_LAYER_MAX_IMAGE_COVERAGE = 0.5     # scans and chart-heavy pages go to the vision model
+TABLE_MIN_FILL = 0.3                    # ruled forms detected as huge, mostly empty tables stay plain text
+TABLE_MAX_DRAWINGS = 2000               # vector paths; past this (dense forms) table detection takes seconds, skip it
+
+_page_stats = {"text_layer": 0, "vision": 0}
+_page_stats_lock = threading.Lock()
 
 def run_gpt_ocr(base64_img, ext="jpeg"):
     """Send an image (base64) to GPT-4o for OCR and interpretation."""
     client = get_openai_client()
     response = client.chat.completions.create(
-        model="gpt-4o",
+        model=OCR_MODEL,
         messages=[{
             "role": "user",
             "content": [
-                {"type": "text", "text": "Extract all visible text from the image with exact formatting, including numbers, tables, special characters, "
-                            "and structured data such as ESG metrics, financial figures, business KPIs, charts, and labels; if graphs or dashboards are present, interpret "
-                            "and summarize key business insights, ESG indicators, and financial or operational risks for audit and reporting; if no text exists, describe "
-                            "the layout, document type, visual elements, and any business context or branding relevant to SME ESG lender analysis and automated due diligence."},
+                {"type": "text", "text": OCR_PROMPT},
                 {"type": "image_url", "image_url": {"url": f"data:image/{ext};base64,{base64_img}"}}
             ]
         }],
@@ -56,9 +74,112 @@ def run_gpt_ocr(base64_img, ext="jpeg"):
     )
     return response.choices[0].message.content
 
+def _ocr_retryable(e):
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+    return isinstance(e, (APIConnectionError, InternalServerError, RateLimitError))
+
+def ocr_with_retries(base64_img, ext="jpeg", max_retries=OCR_MAX_RETRIES):
+    """run_gpt_ocr, retried with capped exponential backoff (full jitter) on transient API errors."""
+    for attempt in range(max_retries + 1):
+        try:
+            return run_gpt_ocr(base64_img, ext=ext)
+        except Exception as e:
+            if attempt == max_retries or not _ocr_retryable(e):
+                raise
+            delay = random.uniform(0, min(OCR_BACKOFF_CAP, OCR_BACKOFF_BASE * 2 ** attempt))
+            print(f"⚠️ OCR request failed ({e}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+def _image_coverage(page):
+    area = abs(page.rect)
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return covered / area if area else 0.0
+
+def extract_text_layer(page):
+    """
+    Text of a PDF page from its text layer, tables as markdown in reading order, or None when the page
+    is a scan, mostly images, or its text is missing or garbled.
+    """
+    if _image_coverage(page) >= TEXT_LAYER_MAX_IMAGE_COVERAGE:
+        return None
+    chars = "".join(page.get_text().split())
+    if len(chars) < TEXT_LAYER_MIN_CHARS or "\ufffd" in chars:
+        return None
+    if sum(c.isalnum() for c in chars) / len(chars) < TEXT_LAYER_MIN_ALNUM:
+        return None
+
+    tables = []
+    candidates = page.find_tables().tables if len(page.get_drawings()) <= TABLE_MAX_DRAWINGS else []
+    for table in candidates:
+        cells = [c for row in table.extract() for c in row]
+        if cells and sum(1 for c in cells if c and c.strip()) / len(cells) >= TABLE_MIN_FILL:
+            tables.append(table)
+    table_rects = [fitz.Rect(t.bbox) for t in tables]
+
+    # Text blocks outside the kept tables, then everything ordered top to bottom, left to right
+    parts = [(t.bbox[1], t.bbox[0], t.to_markdown().strip()) for t in tables]
+    for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks", sort=True):
+        center = fitz.Point((x0 + x1) / 2, (y0 + y1) / 2)
+        if block_type == 0 and not any(center in r for r in table_rects):
+            parts.append((y0, x0, text.strip()))
+    parts.sort(key=lambda p: (p[0], p[1]))
+    return "\n".join(text for _, _, text in parts if text)
+
+def ocr_path_info():
+    """Pages read from the PDF text layer vs sent to the vision model (or its cache), since process start."""
+    with _page_stats_lock:
+        return dict(_page_stats)
+
+def ocr_pdf_pages(data, sha256, concurrency=OCR_CONCURRENCY, text_layer=OCR_TEXT_LAYER):
+    """
+    Every page of a PDF as {"page_num", "text", "source"}, in page order.
+
+    Pages with a usable text layer (extract_text_layer) are read locally, source "text_layer". The
+    others, source "vision", are rendered on a single-thread pool that owns the document (PyMuPDF is
+    not thread-safe) while up to `concurrency` vision requests are in flight, each page retried on
+    its own. Each is rendered at the DPI image_prep.choose_dpi picks for it. Pages that succeed are
+    cached even when another page fails, so calling again only redoes the failed ones.
+    """
+    from utils.image_prep import choose_dpi, prepare_image, render_page
+    from utils.ocr_cache import cached_ocr
+
+    doc = fitz.open(stream=data, filetype="pdf")
+    page_count = doc.page_count
+    texts = [extract_text_layer(page) if text_layer else None for page in doc]
+    vision_pages = [i for i, text in enumerate(texts) if text is None]
+    with _page_stats_lock:
+        _page_stats["text_layer"] += page_count - len(vision_pages)
+        _page_stats["vision"] += len(vision_pages)
+
+    dpis = {i: choose_dpi(doc[i]) for i in vision_pages}
+
+    def render(i):
+        return prepare_image(render_page(doc[i], dpis[i]))
+
+    if vision_pages:
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-render") as render_pool, \
+             ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(vision_pages))), thread_name_prefix="ocr") as ocr_pool:
+            def ocr_page(i):
+                # Rendered only on a cache miss
+                def compute():
+                    image = render_pool.submit(render, i).result()
+                    return ocr_with_retries(image["base64"], ext=image["ext"])
+                return cached_ocr(sha256, i, dpis[i], OCR_PROMPT_VERSION, compute)
+            futures = {i: ocr_pool.submit(ocr_page, i) for i in vision_pages}
+            errors = {i: f.exception() for i, f in futures.items()}
+
+        failed = [i + 1 for i, e in errors.items() if e is not None]
+        if failed:
+            raise RuntimeError(f"OCR failed on page(s) {failed} of {page_count}") from next(e for e in errors.values() if e is not None)
+        for i, f in futures.items():
+            texts[i] = f.result()
+
+    return [{"page_num": i + 1, "text": text, "source": "vision" if i in vision_pages else "text_layer"}
+            for i, text in enumerate(texts)]
+
 def get_text_from_file(file_obj, file_type=None):
     """
-    Extract text from PDF or image using GPT-4o Vision.
+    Extract text from PDF (text layer where usable) or image using GPT-4o Vision.
 
     Args:
         file_obj: file-like object or raw bytes
@@ -67,40 +188,36 @@ def get_text_from_file(file_obj, file_type=None):
     Returns:
         dict with keys:
             - "pages": list of dicts { "page_num": int, "text": str }
+
+    PDF pages with a usable text layer are read locally, the others go to the vision model
+    concurrently (ocr_pdf_pages); pages already read from identical file bytes are served from the
+    OCR cache (utils/ocr_cache.py). PDF pages also carry "source": "text_layer" or "vision".
     """
+    from utils.image_prep import prepare_image
+    from utils.ocr_cache import cached_ocr, file_digest
     results = []
 
     if not file_type and hasattr(file_obj, "type"):
         file_type = file_obj.type
 
+    if hasattr(file_obj, "read"):
+        data = file_obj.read()
+    elif isinstance(file_obj, bytes):
+        data = file_obj  # already bytes
+    else:
+        data = Path(str(file_obj)).read_bytes()  # fallback path
+    sha256 = file_digest(data)
+
     # Handle PDFs
     if file_type and "pdf" in file_type:
-        if hasattr(file_obj, "read"):
-            pdf_bytes = file_obj.read()
-        else:
-            pdf_bytes = file_obj  # already bytes
-
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        for i, page in enumerate(doc):
-            pix = page.get_pixmap()
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-
-            base64_img = encode_image(img)
-            text = run_gpt_ocr(base64_img)
-            results.append({"page_num": i + 1, "text": text})
+        results.extend(ocr_pdf_pages(data, sha256))
 
     # Handle Images
     else:
-        if hasattr(file_obj, "read"):
-            img = Image.open(file_obj)
-        elif isinstance(file_obj, bytes):
-            img = Image.open(io.BytesIO(file_obj))
-        else:
-            img = Image.open(str(file_obj))  # fallback path
-
-        ext = file_type.split("/")[-1] if file_type else "jpeg"
-        base64_img = encode_image(img)
-        text = run_gpt_ocr(base64_img, ext=ext)
+        def ocr_image():
+            image = prepare_image(Image.open(io.BytesIO(data)), len(data))
+            return ocr_with_retries(image["base64"], ext=image["ext"])
+        text = cached_ocr(sha256, 0, 0, OCR_PROMPT_VERSION, ocr_image)
         results.append({"page_num": 1, "text": text})
 
     return {"pages": results}
@@ -122,13 +239,13 @@ def generate_summary(prompt):
 # ===================================================================
 
 # Supply chain mapping
-def supply_chain_map(sme_id, sme_risk_score, output_file=None, db_path="esg_scoring.db"):
+def supply_chain_map(sme_id, sme_risk_score, output_file=None, db_path=None):
     if output_file is None:
         tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".html")
         output_file = tmp.name
         tmp.close()
 
-    conn = sqlite3.connect(db_path)
+    conn = get_connection(db_path)
     c = conn.cursor()
 
     # Get SME
@@ -136,7 +253,6 @@ def supply_chain_map(sme_id, sme_risk_score, output_file=None, db_path="esg_scor
     smes = c.fetchone()
 
     if smes is None:
-        conn.close()
         raise ValueError(f"No SME found with sme_id={sme_id}")
 
     sme_id_val, business_name = smes
@@ -144,7 +260,6 @@ def supply_chain_map(sme_id, sme_risk_score, output_file=None, db_path="esg_scor
     # Get suppliers
     c.execute("SELECT supplier_id, sme_id, supplier_name FROM supplier WHERE sme_id = ?", (sme_id,))
     suppliers = c.fetchall()
-    conn.close()
 
     net = Network(height="512px", width="100%", bgcolor="#222222", font_color="white")
 
@@ -160,11 +275,10 @@ def supply_chain_map(sme_id, sme_risk_score, output_file=None, db_path="esg_scor
     return output_file
 
 # Web Scrape Methods
-def philgeps_blacklist():
-    url = "https://onlineblacklistingportal.gppb.gov.ph/obp-backend/cbr/cbr_public/?category=BLACKLISTED_ENTITIES"
-    data = requests.get(url).json()
+PHILGEPS_URL = "https://onlineblacklistingportal.gppb.gov.ph/obp-backend/cbr/cbr_public/?category=BLACKLISTED_ENTITIES"
 
-    df = pd.DataFrame(data)
+def parse_philgeps(content):
+    df = pd.DataFrame(json.loads(content))
 
     cleaned_df = df[["category", "blacklisted_entity", "project", "offenses",
                     "saction_imposed", "start_date", "end_date"]]
@@ -173,62 +287,13 @@ def philgeps_blacklist():
     cleaned_df["RISK_TAG"] = cleaned_df["RISK_TAG"].astype(str)
     return cleaned_df
 
-def sec_suspended():
-    session = requests.Session()
-
-    base_url = "https://checkwithsec.sec.gov.ph"
-    suspended_url = f"{base_url}/check-with-sec/suspended"
-
-    headers = {
-        "User-Agent": "Mozilla/5.0"
-    }
-
-    response = session.get(suspended_url, headers=headers)
-    soup = BeautifulSoup(response.text, "html.parser")
-    csrf_token = soup.find("input", {"name": "_csrf"})["value"]
-
-    post_headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-        "Referer": suspended_url,
-        "X-Requested-With": "XMLHttpRequest",
-        "Origin": base_url,
-    }
-
-    all_companies = []
-    page = 1
-    max_pages = 115
-
-    while page <= max_pages:
-        payload = {
-            "_csrf": csrf_token,
-            "user_input": "",
-            "page": page
-        }
-
-        try:
-            post_response = session.post(suspended_url, headers=post_headers,
-                                         data=payload, timeout=20)
-            post_response.raise_for_status()
-            json_data = post_response.json()
-        except Exception as e:
-            print(f"⚠️ Error on page {page}: {e}, retrying...")
-            time.sleep(10)
-            continue
-
-        if json_data.get("status") != "success":
-            print(f"⚠️ Server error on page {page}: {json_data.get('response')}")
-            time.sleep(10)
-            continue
-
-        companies = json_data["response"]["data"]
-        if not companies:
-            break
-
-        all_companies.extend(companies)
-        print(f"✅ Page {page} scraped, got {len(companies)} records")
-
-        page += 1
-        time.sleep(random.uniform(2, 5))
+def philgeps_blacklist():
+    # Conditional fetch through the disk cache (ETag / Last-Modified), see utils/fetch_cache.py
+    from utils.fetch_cache import fetch_source
+    return parse_philgeps(fetch_source("philgeps", PHILGEPS_URL).content)
 
-    return pd.DataFrame(all_companies)
+def sec_suspended():
+    # Concurrent, rate-limited fetch of every page, see utils/sec_scraper.py for the resumable,
+    # checkpointed scraper that streams into the watchlist staging table
+    from utils.sec_scraper import SecScraper
+    return pd.DataFrame(SecScraper().fetch_all())
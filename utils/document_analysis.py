@@ -0,0 +1,42 @@
+"""
+Concurrent OCR + summary of the documents uploaded in one sme_form step.
+
+Every document of a step is independent (its own OCR, then its own generate_summary prompt), so
+analyze_documents runs them on a thread pool and returns when the slowest one is done instead of
+after the sum of all of them. Uploads are read on the calling thread; workers only see bytes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.ai_utils import get_text_from_file, generate_summary
+
+def _read(file_obj):
+    file_obj.seek(0)
+    return file_obj.read()
+
+def analyze_document(data, prompt_template, file_type="application/pdf"):
+    """OCR a document and answer prompt_template, whose {full_text} is replaced by the text of all pages."""
+    ocr_result = get_text_from_file(data, file_type=file_type)
+
+    # Join all pages for complete document analysis
+    full_text = "\n".join(p["text"] for p in ocr_result["pages"])
+    return generate_summary(prompt_template.format(full_text=full_text))
+
+def analyze_documents(jobs, file_type="application/pdf"):
+    """
+    Run analyze_document for every {name: (uploaded file or None, prompt template)} concurrently.
+
+    Returns {name: summary} for the uploaded files (missing ones are left out). When a document
+    fails, the others still finish (their OCR pages stay cached) before the first error is raised.
+    """
+    documents = {name: (_read(file_obj), prompt) for name, (file_obj, prompt) in jobs.items() if file_obj is not None}
+    if not documents:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(documents), thread_name_prefix="analyze") as pool:
+        futures = {name: pool.submit(analyze_document, data, prompt, file_type) for name, (data, prompt) in documents.items()}
+        errors = [f.exception() for f in futures.values()]
+
+    error = next((e for e in errors if e is not None), None)
+    if error is not None:
+        raise error
+    return {name: f.result() for name, f in futures.items()}
@@ -0,0 +1,137 @@
+"""
+Conditional-fetch disk cache for watchlist sources.
+
+The raw payload of every source is kept on disk next to its ETag, Last-Modified and sha256. Fetches
+send If-None-Match / If-Modified-Since, so an unchanged remote answers 304 and nothing is downloaded.
+Every payload comes with its sha256 (local files such as the BIR csv too): consumers keep the hash
+they last ingested successfully themselves, next to the data it went into (data/watchlist.py stores it
+in the database), so they can skip parsing and re-ingesting unchanged data, and a failed ingest is
+retried on the next refresh.
+
+Fetch and parse timings are printed per source and kept in the metadata file.
+"""
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import requests
+
+CACHE_DIR = os.environ.get("CLARITYESG_FETCH_CACHE", os.path.join("data", "cache", "sources"))
+HASH_BLOCK_SIZE = 1 << 20
+
+
+class FetchResult:
+    def __init__(self, source, location, content, status, sha256, meta, fetch_seconds):
+        self.source = source
+        self.location = location
+        self.content = content         # None for local files, see open()
+        self.status = status            # "downloaded", "not_modified" (304) or "local"
+        self.sha256 = sha256
+        self.meta = meta
+        self.fetch_seconds = fetch_seconds
+
+    def open(self):
+        """Binary file object over the payload, local files are streamed from disk rather than loaded."""
+        return open(self.location, "rb") if self.content is None else io.BytesIO(self.content)
+
+    def record_parse(self, seconds, rows):
+        self.meta["parse_seconds"] = round(seconds, 4)
+        self.meta["rows"] = rows
+        _write_meta(self.source, self.meta)
+        print(f"⏱️ {self.source}: parsed {rows:,} rows in {seconds:.2f}s")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def _paths(source):
+    return os.path.join(CACHE_DIR, f"{source}.body"), os.path.join(CACHE_DIR, f"{source}.meta.json")
+
+def _read_meta(source):
+    _, meta_path = _paths(source)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _write_meta(source, meta):
+    _, meta_path = _paths(source)
+    _atomic_write(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _read_body(source):
+    body_path, _ = _paths(source)
+    try:
+        with open(body_path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def fetch_source(source, location, timeout=30, force=False, session=None):
+    """
+    Fetch a source payload through the disk cache.
+
+    Args:
+        source: cache key, e.g. "philgeps"
+        location: http(s) URL, or a local file path
+        force: ignore the cached validators and download in full
+
+    Returns:
+        FetchResult, compare .sha256 with the hash last ingested before parsing
+    """
+    meta = _read_meta(source)
+    start = time.perf_counter()
+
+    if not location.startswith(("http://", "https://")):
+        # Hashed in blocks, the file itself is read again by the parser
+        digest = hashlib.sha256()
+        size = 0
+        with open(location, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+                size += len(block)
+        content, status = None, "local"
+    else:
+        cached = _read_body(source)
+        headers = {}
+        if cached is not None and not force and meta.get("url") == location:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = (session or requests).get(location, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached is not None:
+            content, status = cached, "not_modified"
+        else:
+            response.raise_for_status()
+            content, status = response.content, "downloaded"
+            meta["etag"] = response.headers.get("ETag")
+            meta["last_modified"] = response.headers.get("Last-Modified")
+
+    if content is not None:
+        digest = hashlib.sha256(content)
+        size = len(content)
+    sha256 = digest.hexdigest()
+    fetch_seconds = time.perf_counter() - start
+    if status == "downloaded":
+        body_path, _ = _paths(source)
+        _atomic_write(body_path, content)
+
+    meta.update(url=location, sha256=sha256, size=size, fetched_at=_now(),
+                status=status, fetch_seconds=round(fetch_seconds, 4))
+    _write_meta(source, meta)
+
+    result = FetchResult(source, location, content, status, sha256, meta, fetch_seconds)
+    print(f"⏱️ {source}: {status} {size:,} bytes in {fetch_seconds:.2f}s")
+    return result
@@ -0,0 +1,137 @@
+"""
+Image preparation for GPT-4o OCR requests.
+
+The model fits every image into 2048x2048 and then scales its shorter side down to 768 px, so
+pixels past that are uploaded and thrown away. PDF pages are rendered at a DPI chosen from the page
+size, its text and its embedded scans; uploads are downsized to the same limit. Transparent images
+are flattened on white, grayscale content is sent as one channel, and flat content (text, line art,
+a handful of colors) is sent as a 16-color PNG while photos and noisy scans go out as JPEG.
+
+Each prepared image reports the payload it sends against the input it came from (the uploaded file,
+or the raw pixels of a rendered page), without a second encode; image_prep_info() sums them up.
+benchmarks/bench_image_prep.py compares the payload with the previous encoding.
+"""
+import base64
+import io
+import threading
+
+import fitz
+from PIL import Image, ImageChops
+
+MODEL_MAX_SIDE = 2048
+MODEL_SHORT_SIDE = 768          # useful maximum of the shorter side
+SPARSE_SHORT_SIDE = 512         # pages with little text and no scan (charts, cover pages)
+MIN_DPI = 72
+MAX_DPI = 300
+DENSE_CHARS_PER_SQ_INCH = 8     # text layer density past which a page counts as text-heavy
+GRAY_TOLERANCE = 16             # max channel spread still treated as gray
+PNG_COLORS = 16                 # palette of flat content
+FLAT_MIN_SHARE = 0.8            # share of thumbnail pixels in its PNG_COLORS most common colors
+JPEG_QUALITY = 75
+
+_stats = {"requests": 0, "bytes": 0, "input_bytes": 0}
+_stats_lock = threading.Lock()
+
+def choose_dpi(page):
+    """
+    Render resolution of a PDF page: enough for MODEL_SHORT_SIDE px on its shorter side, less for
+    sparse pages, and never above the native resolution of a scan covering most of the page.
+    """
+    rect = page.rect
+    short_inches = min(rect.width, rect.height) / 72
+    if short_inches <= 0:
+        return MIN_DPI
+
+    area = abs(rect)
+    scan = None
+    for info in page.get_image_info():
+        covered = abs(fitz.Rect(info["bbox"]) & rect)
+        if covered >= area / 2 and (scan is None or covered > scan[0]):
+            scan = (covered, info)
+    chars = len("".join(page.get_text().split()))
+    dense = chars / (area / 72 / 72) >= DENSE_CHARS_PER_SQ_INCH
+
+    target = MODEL_SHORT_SIDE if scan or dense else SPARSE_SHORT_SIDE
+    dpi = target / short_inches
+    if scan:
+        bbox = fitz.Rect(scan[1]["bbox"])
+        dpi = min(dpi, scan[1]["width"] / (bbox.width / 72))
+    return int(max(MIN_DPI, min(MAX_DPI, dpi)))
+
+def render_page(page, dpi):
+    pix = page.get_pixmap(dpi=dpi, alpha=False)
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+def _flatten(img):
+    # Transparency on white, every other mode to RGB or L
+    if img.mode == "P":
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    if img.mode in ("RGBA", "LA", "PA"):
+        background = Image.new("RGB", img.size, "white")
+        background.paste(img.convert("RGBA"), mask=img.convert("RGBA").getchannel("A"))
+        return background
+    if img.mode in ("L", "RGB"):
+        return img
+    if img.mode in ("1", "I", "I;16", "F"):
+        return img.convert("L")
+    return img.convert("RGB")
+
+def _is_gray(thumb):
+    if thumb.mode == "L":
+        return True
+    r, g, b = thumb.split()
+    spread = max(ImageChops.difference(r, g).getextrema()[1], ImageChops.difference(g, b).getextrema()[1])
+    return spread <= GRAY_TOLERANCE
+
+def _fit(img):
+    w, h = img.size
+    scale = min(1.0, MODEL_MAX_SIDE / max(w, h), MODEL_SHORT_SIDE / min(w, h))
+    if scale < 1.0:
+        img = img.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.LANCZOS)
+    return img
+
+def prepare_image(img, input_bytes=None):
+    """
+    Downsized, flattened and encoded img for run_gpt_ocr.
+
+    input_bytes is the size of the input as received (e.g. the uploaded file), by default the raw
+    pixel data of img (a rendered page).
+
+    Returns {"base64", "ext", "width", "height", "bytes", "input_bytes", "bytes_saved"}, bytes being
+    the base64 payload size.
+    """
+    if input_bytes is None:
+        input_bytes = img.width * img.height * len(img.getbands())
+    img = _fit(_flatten(img))
+
+    # Nearest-neighbour thumbnail, so antialiasing does not invent colors
+    scale = min(1.0, 256 / max(img.size))
+    thumb = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.NEAREST)
+    if _is_gray(thumb):
+        img, thumb = img.convert("L"), thumb.convert("L")
+    counts = sorted((count for count, _ in thumb.getcolors(thumb.width * thumb.height)), reverse=True)
+    flat = sum(counts[:PNG_COLORS]) >= FLAT_MIN_SHARE * thumb.width * thumb.height
+
+    buf = io.BytesIO()
+    if flat:
+        img.quantize(PNG_COLORS).save(buf, format="PNG", optimize=True)
+    else:
+        img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    payload = base64.b64encode(buf.getvalue()).decode("utf-8")
+
+    prepared = {
+        "base64": payload, "ext": "png" if flat else "jpeg", "width": img.width, "height": img.height,
+        "bytes": len(payload), "input_bytes": input_bytes, "bytes_saved": input_bytes - len(payload),
+    }
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["bytes"] += len(payload)
+        _stats["input_bytes"] += input_bytes
+    return prepared
+
+def image_prep_info():
+    """Images prepared, base64 payload bytes sent and bytes saved against their inputs, since process start."""
+    with _stats_lock:
+        info = dict(_stats)
+    info["bytes_saved"] = info["input_bytes"] - info["bytes"]
+    return info
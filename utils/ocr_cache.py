@@ -0,0 +1,155 @@
+"""
+Persistent cache of GPT-4o OCR results.
+
+Each page result is keyed on the sha256 of the uploaded file's bytes, the page index, the DPI it was
+rendered at (0 for image uploads) and OCR_PROMPT_VERSION, so the same bill uploaded twice,
+or re-processed from data/uploads, costs one vision call per page only once. Texts are stored
+zlib-compressed in their own SQLite file (not esg_scoring.db), evicted by age since the last hit and
+then least recently used first down to a size budget.
+
+Usage:
+    python -m utils.ocr_cache [--evict] [--clear]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+import zlib
+
+from data.connection import get_connection
+
+CACHE_PATH = os.environ.get("CLARITYESG_OCR_CACHE", os.path.join("data", "cache", "ocr_cache.db"))
+MAX_BYTES = 256 * 1024 * 1024        # compressed text, all entries
+MAX_AGE_DAYS = 180                   # since the last hit
+EVICT_EVERY = 100                    # stores between automatic evictions
+COMPRESS_LEVEL = 6
+
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0, "bytes_saved": 0}
+_stats_lock = threading.Lock()
+
+def _conn():
+    os.makedirs(os.path.dirname(os.path.abspath(CACHE_PATH)), exist_ok=True)
+    conn = get_connection(CACHE_PATH)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ocr_cache (
+            sha256 TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            dpi INTEGER NOT NULL,
+            prompt_version INTEGER NOT NULL,
+            text_z BLOB NOT NULL,
+            raw_size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_hit_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sha256, page, dpi, prompt_version)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_hit ON ocr_cache(last_hit_at)")
+    return conn
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+def get(sha256, page, dpi, prompt_version):
+    """Cached OCR text of one page, or None."""
+    conn = _conn()
+    row = conn.execute(
+        "SELECT text_z FROM ocr_cache WHERE sha256 = ? AND page = ? AND dpi = ? AND prompt_version = ?",
+        (sha256, page, dpi, prompt_version),
+    ).fetchone()
+    with _stats_lock:
+        _stats["hits" if row else "misses"] += 1
+    if row is None:
+        return None
+    with conn:
+        conn.execute(
+            "UPDATE ocr_cache SET hits = hits + 1, last_hit_at = ? WHERE sha256 = ? AND page = ? AND dpi = ? AND prompt_version = ?",
+            (time.time(), sha256, page, dpi, prompt_version),
+        )
+    return zlib.decompress(row[0]).decode("utf-8")
+
+def put(sha256, page, dpi, prompt_version, text):
+    raw = text.encode("utf-8")
+    packed = zlib.compress(raw, COMPRESS_LEVEL)
+    now = time.time()
+    conn = _conn()
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO ocr_cache (sha256, page, dpi, prompt_version, text_z, raw_size, created_at, last_hit_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (sha256, page, dpi, prompt_version, packed, len(raw), now, now))
+    with _stats_lock:
+        _stats["stores"] += 1
+        _stats["bytes_saved"] += len(raw) - len(packed)
+        due = _stats["stores"] % EVICT_EVERY == 0
+    if due:
+        evict()
+
+def cached_ocr(sha256, page, dpi, prompt_version, compute):
+    """Text of one page from the cache, or compute() it (the vision call) and store it."""
+    text = get(sha256, page, dpi, prompt_version)
+    if text is None:
+        text = compute()
+        put(sha256, page, dpi, prompt_version, text)
+    return text
+
+def evict(max_bytes=MAX_BYTES, max_age_days=MAX_AGE_DAYS):
+    """Drop entries not hit for max_age_days, then the least recently hit until under max_bytes. Returns rows dropped."""
+    conn = _conn()
+    with conn:
+        dropped = conn.execute("DELETE FROM ocr_cache WHERE last_hit_at < ?", (time.time() - max_age_days * 86400,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(length(text_z)), 0) FROM ocr_cache").fetchone()[0]
+        if total > max_bytes:
+            # Walk from the most recently hit entry and keep everything that still fits the budget
+            dropped += conn.execute("""
+                DELETE FROM ocr_cache WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, SUM(length(text_z)) OVER (ORDER BY last_hit_at DESC, rowid DESC) AS running
+                        FROM ocr_cache
+                    ) WHERE running > ?
+                )
+            """, (max_bytes,)).rowcount
+    with _stats_lock:
+        _stats["evicted"] += dropped
+    return dropped
+
+def clear():
+    conn = _conn()
+    with conn:
+        conn.execute("DELETE FROM ocr_cache")
+
+def ocr_cache_info():
+    """Hit/miss counters since process start, plus the size of the cache on disk."""
+    entries, stored, raw, hits = _conn().execute(
+        "SELECT COUNT(*), COALESCE(SUM(length(text_z)), 0), COALESCE(SUM(raw_size), 0), COALESCE(SUM(hits), 0) FROM ocr_cache"
+    ).fetchone()
+    with _stats_lock:
+        info = dict(_stats)
+    lookups = info["hits"] + info["misses"]
+    info.update(
+        hit_rate=info["hits"] / lookups if lookups else None,
+        entries=entries, stored_bytes=stored, raw_bytes=raw, lifetime_hits=hits,
+        max_bytes=MAX_BYTES, max_age_days=MAX_AGE_DAYS,
+    )
+    return info
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or trim the OCR result cache.")
+    parser.add_argument("--evict", action="store_true", help="apply the size and age limits now")
+    parser.add_argument("--clear", action="store_true", help="drop every entry")
+    args = parser.parse_args(argv)
+
+    if args.clear:
+        clear()
+        print("✅ OCR cache cleared")
+    elif args.evict:
+        print(f"✅ Evicted {evict()} entries")
+    info = ocr_cache_info()
+    print(f"{info['entries']} pages cached in {CACHE_PATH}: {info['stored_bytes']:,} bytes compressed "
+          f"({info['raw_bytes']:,} raw), {info['lifetime_hits']} hits since stored")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,12 +2,13 @@ import os
 import io
 import json
 import re
-import sqlite3
 import textwrap
 import tempfile
 
 from datetime import datetime
 from data.database import get_audit_score
+from data.audit import flush_audit_log, load_explanation
+from data.connection import get_connection
 from pathlib import Path
 
 import seaborn as sns
@@ -21,7 +22,6 @@ from reportlab.lib.units import cm
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
 
-DB_PATH = "esg_scoring.db"  
 def get_openai_client():
     try:
         import streamlit as st
@@ -43,26 +43,25 @@ def get_openai_client():
     return OpenAI(api_key=api_key)
 
 # Get json and date created
-def load_latest_explanation(sme_id, db_path=DB_PATH):
-    conn = sqlite3.connect(db_path)
+def load_latest_explanation(sme_id, db_path=None):
+    flush_audit_log(db_path)
+    conn = get_connection(db_path)
     row = conn.execute("""
-        SELECT explanation_json, created_at 
-        FROM audit_log 
-        WHERE sme_id=? 
+        SELECT id, created_at
+        FROM audit_log
+        WHERE sme_id=?
         ORDER BY created_at DESC, id DESC LIMIT 1
     """, (sme_id,)).fetchone()
-    conn.close()
     if not row:
         return None, None
-    exp = json.loads(row[0])
+    exp = load_explanation(row[0], db_path)
     created_at = row[1]
     return exp, created_at
 
 # Get all sme data
-def load_sme_record(sme_id, db_path=DB_PATH):
-    conn = sqlite3.connect(db_path)
+def load_sme_record(sme_id, db_path=None):
+    conn = get_connection(db_path)
     df = pd.read_sql("SELECT * FROM sme WHERE sme_id=?", conn, params=(sme_id,))
-    conn.close()
     if df.empty:
         return None
     return df.iloc[0].to_dict()
@@ -180,10 +179,10 @@ def draft_risk_analysis(explanation, sme_info):
     )
     return resp.choices[0].message.content.strip()
 
-def save_score_history_chart(sme_id, db_path=DB_PATH) -> str:
+def save_score_history_chart(sme_id, db_path=None) -> str:
     # Fetch last 10 audit scores
-    audit_df = get_audit_score(sme_id)
-    audit_df = audit_df.sort_values(by="created_at", ascending=True).iloc[0:10]
+    audit_df = get_audit_score(sme_id, limit=10)
+    audit_df = audit_df.sort_values(by="created_at", ascending=True)
     
     plt.figure(figsize=(8, 4))
     
@@ -1,52 +1,120 @@
-import sqlite3
-import difflib
+import hashlib
 import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 import numpy as np
 import pandas as pd
-from data.database import get_id
-
-# Module-level watchlist cache to avoid reloading on every check_supplier call
-_watchlist_cache = None
+from data.audit import audit_writer, record_score
+from data.connection import get_connection, get_db_path
+from data.database import SCREENING_CURRENT_SQL, get_watchlist_version
+from utils.similarity import get_scorer
+from utils.watchlist_index import WatchlistIndex, clean_sme_name
+
+WASTE_MANAGEMENT_SCORES = {
+    "No formal waste management policy": 0,
+    "Basic disposal only (no recycling or tracking)": 25,
+    "Recycling program in place": 50,
+    "Comprehensive waste reduction + recycling + tracking": 75,
+    "Zero-waste or closed-loop operations": 100
+}
+
+FIN_REPORTING_SCORES = {"Monthly": 100,
+                        "Quarterly": 75,
+                        "Yearly": 50,
+                        "Daily": 75}
+
+# Usage bins: upper bounds (inclusive) and the score for each bin, the last score is for anything above
+ENERGY_BINS, ENERGY_SCORES = [500, 2000, 8000], [100, 75, 50, 25]
+WATER_BINS, WATER_SCORES = [20, 50, 100], [100, 75, 50, 25]
+GHG_BINS, GHG_SCORES = [300, 700, 1200], [100, 75, 50, 25]
+
+# Watchlist cache, shared by every check_supplier call in the process.
+#
+# The watchlist rows, their WatchlistIndex and an LRU memo of check_supplier results are kept together
+# for one watchlist version (watchlist_meta.version) and replaced as a whole, with a single assignment,
+# as soon as the version in the database moves on. A reader therefore never sees a new index with old
+# memoized scores, and a watchlist refresh takes effect without restarting the process.
+CHECK_SUPPLIER_MEMO_SIZE = 20_000
+
+class _WatchlistState:
+    def __init__(self, version, entries):
+        self.version = version
+        self.entries = entries
+        self.index = WatchlistIndex(entries)
+        self.best_score = lru_cache(maxsize=CHECK_SUPPLIER_MEMO_SIZE)(self._best_score)
+
+    def _best_score(self, clean_name, threshold, scorer):
+        return self.index.best_score(clean_name, threshold, scorer, clean=False)
+
+_watchlist_state = None
+_watchlist_lock = threading.Lock()
+_memo_totals = {"hits": 0, "misses": 0, "invalidations": 0}
+
+def _get_watchlist_state():
+    global _watchlist_state
+    version = get_watchlist_version()
+    state = _watchlist_state
+    if state is not None and state.version == version:
+        return state
+
+    with _watchlist_lock:
+        state = _watchlist_state
+        if state is None or state.version != version:
+            conn = get_connection()
+            c = conn.cursor()
+            c.execute("SELECT business_name, risk_tag, clean_name FROM supplier_watchlist")
+            new_state = _WatchlistState(version, c.fetchall())
+            if state is not None:
+                info = state.best_score.cache_info()
+                _memo_totals["hits"] += info.hits
+                _memo_totals["misses"] += info.misses
+                _memo_totals["invalidations"] += 1
+            _watchlist_state = state = new_state
+    return state
+
+def refresh_watchlist_index():
+    """Swap in the index for the current watchlist version now, instead of on the next check_supplier call."""
+    return _get_watchlist_state().version
 
 def _get_watchlist():
-    global _watchlist_cache
-    if _watchlist_cache is None:
-        conn = sqlite3.connect("esg_scoring.db")
-        c = conn.cursor()
-        c.execute("SELECT business_name, risk_tag FROM supplier_watchlist")
-        _watchlist_cache = c.fetchall()
-        conn.close()
-    return _watchlist_cache
+    return _get_watchlist_state().entries
+
+def _get_watchlist_index():
+    return _get_watchlist_state().index
+
+def check_supplier_cache_info():
+    """Hit/miss counters of the check_supplier memo (since process start) and its current size."""
+    state = _watchlist_state
+    info = state.best_score.cache_info() if state is not None else None
+    return {
+        "watchlist_version": state.version if state is not None else None,
+        "hits": _memo_totals["hits"] + (info.hits if info else 0),
+        "misses": _memo_totals["misses"] + (info.misses if info else 0),
+        "size": info.currsize if info else 0,
+        "maxsize": CHECK_SUPPLIER_MEMO_SIZE,
+        "invalidations": _memo_totals["invalidations"],
+    }
 
 # Supplier risk tracker
-def clean_sme_name(name):
-    replace_words = ["INCORPORATED", "CORPORATION", "RESPONDENT", "INC", "COMPANY", ".", ","]
-    name = name.upper()
-    for r in replace_words:
-        name = name.replace(r, "")
-    return " ".join(name.split())
-
-def check_supplier(supplier_name: str, threshold: float = 0.8):
-    watchlist = _get_watchlist()
-
-    results = []
-    s_clean = clean_sme_name(supplier_name)
-
-    for business_name, risk_tag in watchlist:
-        v_clean = clean_sme_name(business_name)
-        score = difflib.SequenceMatcher(None, s_clean, v_clean).ratio()
-
-        if score >= threshold:
-            results.append({
-                "business_name": business_name,
-                "risk_tag": risk_tag,
-                "score": score
-            })
+def match_supplier(supplier_name: str, threshold: float = 0.8, k: int = 5, scorer: str = "ratio"):
+    """Top-k watchlist matches for a supplier, each a dict with business_name, risk_tag and score."""
+    get_scorer(scorer, indexed=True)
+    return _get_watchlist_index().match(supplier_name, threshold, k, scorer)
 
+def check_supplier(supplier_name: str, threshold: float = 0.8, scorer: str = "ratio"):
     # return highest similarity score (0.0–1.0) if any match, otherwise 0
-    if results:
-        return max(r["score"] for r in results)
-    return 0.0
+    # memoized on the cleaned name, which is all the match depends on
+    # only indexed scorers, the others scan the whole watchlist (offline screening)
+    get_scorer(scorer, indexed=True)
+    return _get_watchlist_state().best_score(clean_sme_name(supplier_name), threshold, scorer)
+
+def stored_watchlist_score(risk_tags, supplier_name):
+    # Screening result stored on the supplier row (risk_tags is only passed when it matches the current
+    # watchlist version), falling back to matching the name now for rows not screened yet
+    if risk_tags:
+        return float(json.loads(risk_tags)["match_score"])
+    return float(check_supplier(str(supplier_name)))
 
 # Auto normalize
 def normalize(value, min_val, max_val):
@@ -56,35 +124,116 @@ def normalize(value, min_val, max_val):
 
 # get sector risk
 def sector_risk_avg(sector_name):
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     df = pd.read_sql("SELECT * FROM esg_sector_risks WHERE sector = ?", conn, params=(sector_name,))
-    conn.close()
     df["avg_score"] = (df["env_risk"] + df["soc_risk"] + df["gov_risk"]) / 3
     return df[["sector", "avg_score"]]
 
 def region_risk(region_name):
-    conn = sqlite3.connect("esg_scoring.db")
+    conn = get_connection()
     df = pd.read_sql("SELECT * FROM region_risks WHERE region = ?", conn, params=(region_name,))
-    conn.close()
     return df
 
-# Scoring method or formula for SMEs
-def score_sme(sme_id, industry_sector, region, db_path="esg_scoring.db"):
-    conn = sqlite3.connect(db_path)
+# Supplier scoring
+SUPPLIER_DETAIL_KEYS = ("supplier_name", "name_score", "sector_score", "region_score", "permit_score", "final_supplier_score")
 
-    sme = pd.read_sql("""SELECT * FROM sme where sme_id=?""", conn, params=(sme_id,))
-    if sme.empty:
-        conn.close()
+def supplier_score_inputs(sme_id, db_path=None):
+    # Every supplier of the SME with its sector average and region score, in one query
+    conn = get_connection(db_path)
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT s.supplier_id, s.sme_id, s.supplier_name, s.supplier_sector, s.supplier_region, s.supplier_permit,
+               (r.env_risk + r.soc_risk + r.gov_risk) / 3.0 AS sector_avg,
+               g.score AS region_score,
+               CASE WHEN {SCREENING_CURRENT_SQL} THEN s.risk_tags END AS risk_tags
+        FROM supplier s
+        LEFT JOIN esg_sector_risks r ON r.sector = s.supplier_sector
+        LEFT JOIN region_risks g ON g.region = s.supplier_region
+        WHERE s.sme_id = ?
+        ORDER BY s.supplier_id
+    """, (sme_id,))
+    return c.fetchall()
+
+def score_suppliers(sme_id, db_path=None, rows=None):
+    """
+    Score every supplier of an SME (higher is better), from rows of supplier_score_inputs if given.
+
+    Returns:
+        list of dicts with supplier_id, sme_id, supplier_name, supplier_sector, supplier_region,
+        supplier_permit, name_score, sector_score, region_score, permit_score, final_supplier_score
+    """
+    results = []
+    if rows is None:
+        rows = supplier_score_inputs(sme_id, db_path)
+    for supplier_id, id_of_sme, supplier_name, supplier_sector, supplier_region, supplier_permit, sector_avg, region_value, risk_tags in rows:
+        # Watchlist score is 0.0–1.0; multiply by 100 before inverting.
+        name_score = abs(stored_watchlist_score(risk_tags, supplier_name) * 100 - 100)
+        sector_score = abs(normalize(float(sector_avg), 0, 10) - 100) if sector_avg is not None else float("nan")
+        region_score = float(region_value) if region_value is not None else float("nan")
+        permit_score = 100 if int(supplier_permit) == 1 else 50
+        final_supplier_score = ((name_score + sector_score + region_score + permit_score) / 4)
+        results.append({
+            "supplier_id": supplier_id,
+            "sme_id": id_of_sme,
+            "supplier_name": supplier_name,
+            "supplier_sector": supplier_sector,
+            "supplier_region": supplier_region,
+            "supplier_permit": supplier_permit,
+            "name_score": name_score,
+            "sector_score": sector_score,
+            "region_score": region_score,
+            "permit_score": permit_score,
+            "final_supplier_score": final_supplier_score
+        })
+    return results
+
+def score_inputs(sme_id, industry_sector, region, db_path=None):
+    """
+    Everything score_sme reads for one SME, as plain values: the sme row (dict), the average risk of
+    industry_sector, the score of region and the supplier_score_inputs rows.
+    """
+    conn = get_connection(db_path)
+    c = conn.execute("SELECT * FROM sme WHERE sme_id = ?", (sme_id,))
+    row = c.fetchone()
+    if row is None:
         raise ValueError("SME ID not found in database")
+    sme_row = dict(zip([d[0] for d in c.description], row))
+
+    sector = conn.execute("SELECT (env_risk + soc_risk + gov_risk) / 3.0 FROM esg_sector_risks WHERE sector = ?", (industry_sector,)).fetchone()
+    region_row = conn.execute("SELECT score FROM region_risks WHERE region = ?", (region,)).fetchone()
+    return {
+        "sme": sme_row,
+        "sector_avg": sector[0] if sector else None,
+        "region_score": region_row[0] if region_row else None,
+        "suppliers": [list(r) for r in supplier_score_inputs(sme_id, db_path)],
+    }
 
-    c = conn.cursor()
+def score_input_hash(inputs):
+    # sha256 of the score_inputs. Suppliers without a current screening result are matched against the
+    # live watchlist, so its version is part of the inputs then.
+    if any(r[-1] is None for r in inputs["suppliers"]):
+        inputs = dict(inputs, watchlist_version=get_watchlist_version())
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Scoring method or formula for SMEs
+def compute_sme_score(sme_id, industry_sector, region, db_path=None, inputs=None):
+    """
+    Score one SME without writing anything, from its score_inputs if already read.
+
+    Returns:
+        ((final_score, financial_score, env_score, soc_score, gov_score, explanation), input_hash)
+    """
+    if inputs is None:
+        inputs = score_inputs(sme_id, industry_sector, region, db_path)
+    sme = pd.DataFrame([inputs["sme"]])
 
     # Financial
     financial_components = {}
     financial_components["profitability"] = 100 if (int(sme["is_profitable"].iloc[0]) == 1) else 50
 
-    sector_score = sector_risk_avg(industry_sector)
-    financial_components['sector_stability'] = abs(normalize(float(sector_score['avg_score'].iloc[0]), 0, 10) - 100)
+    sector_avg = float(inputs["sector_avg"])
+    financial_components['sector_stability'] = abs(normalize(sector_avg, 0, 10) - 100)
     financial_components['market_competition'] = abs(normalize(int(sme['market_competition'].iloc[0]), 0, 10) - 100)
 
     financial_score = sum(financial_components.values()) / len(financial_components)
@@ -92,8 +241,7 @@ def score_sme(sme_id, industry_sector, region, db_path="esg_scoring.db"):
     # Environment
     env_components = {}
 
-    region_score = region_risk(region)
-    env_components['location_hazard'] = float(region_score["score"].iloc[0])
+    env_components['location_hazard'] = float(inputs["region_score"])
 
     has_bcp = int(sme["has_bcp"].iloc[0])
 
@@ -135,13 +283,7 @@ def score_sme(sme_id, industry_sector, region, db_path="esg_scoring.db"):
 
     has_denr_permit = int(sme["denr_permits"].iloc[0])
 
-    env_components['waste_management'] = {
-        "No formal waste management policy": 0,
-        "Basic disposal only (no recycling or tracking)": 25,
-        "Recycling program in place": 50,
-        "Comprehensive waste reduction + recycling + tracking": 75,
-        "Zero-waste or closed-loop operations": 100
-    }.get(sme["waste_management"].iloc[0], 0)
+    env_components['waste_management'] = WASTE_MANAGEMENT_SCORES.get(sme["waste_management"].iloc[0], 0)
 
     raw_value3 = sme['ghg_emissions'].iloc[0]
 
@@ -177,10 +319,7 @@ def score_sme(sme_id, industry_sector, region, db_path="esg_scoring.db"):
 
     # Governance
     gov_components = {}
-    gov_components['fin_reporting'] = {"Monthly": 100,
-                                       "Quarterly": 75,
-                                       "Yearly": 50,
-                                       "Daily": 75}.get(sme['fin_reporting_freq'].iloc[0], 50)
+    gov_components['fin_reporting'] = FIN_REPORTING_SCORES.get(sme['fin_reporting_freq'].iloc[0], 50)
     gov_components['inspection_score'] = float(sme["inspection_score"].iloc[0])
 
     gov_score = sum(gov_components.values()) / len(gov_components)
@@ -189,34 +328,8 @@ def score_sme(sme_id, industry_sector, region, db_path="esg_scoring.db"):
     gov_score_bonus = gov_score + has_policies
 
     # Supply Chain Score
-    _, data = get_id(sme_id)
-
-    supplier_scores = []
-    supplier_breakdowns = []
-    for supplier_name, supplier_sector, supplier_region, supplier_permit in zip(data.supplier_name,
-                                                                                data.supplier_sector,
-                                                                                data.supplier_region,
-                                                                                data.supplier_permit):
-        # Higher is better. check_supplier returns 0.0–1.0; multiply by 100 before inverting.
-        name_score = abs(float(check_supplier(str(supplier_name))) * 100 - 100)
-
-        sector_df = sector_risk_avg(str(supplier_sector))
-        sector_score = abs(normalize(float(sector_df["avg_score"].iloc[0]), 0, 10) - 100)
-
-        region_df = region_risk(str(supplier_region))
-        region_score = float(region_df["score"].iloc[0])
-
-        permit_score = 100 if int(supplier_permit) == 1 else 50
-        final_supplier_score = ((name_score + sector_score + region_score + permit_score) / 4)
-        supplier_scores.append(final_supplier_score)
-        supplier_breakdowns.append({
-            "supplier_name": supplier_name,
-            "name_score": name_score,
-            "sector_score": sector_score,
-            "region_score": region_score,
-            "permit_score": permit_score,
-            "final_supplier_score": final_supplier_score
-        })
+    supplier_breakdowns = [{k: s[k] for k in SUPPLIER_DETAIL_KEYS} for s in score_suppliers(sme_id, db_path, inputs["suppliers"])]
+    supplier_scores = [s["final_supplier_score"] for s in supplier_breakdowns]
 
     average_supplier_score = np.mean(supplier_scores) if supplier_scores else 50
 
@@ -225,7 +338,6 @@ def score_sme(sme_id, industry_sector, region, db_path="esg_scoring.db"):
 
     final_score = (base_score * 0.60) + (average_supplier_score * 0.40)
 
-    # Save to audit log
     explanation = {
         "financial_score": financial_score,
         "environmental_score": env_score,
@@ -236,25 +348,224 @@ def score_sme(sme_id, industry_sector, region, db_path="esg_scoring.db"):
         "suppliers_detail": supplier_breakdowns,
         "final_score": final_score
     }
-    c.execute("""
-        SELECT explanation_json FROM audit_log
-        WHERE sme_id = ?
-        ORDER BY created_at DESC LIMIT 1
-    """, (sme_id,))
-    row = c.fetchone()
+    return (final_score, financial_score, env_score, soc_score, gov_score, explanation), score_input_hash(inputs)
+
+# Score cache
+#
+# Scores are cached under the hash of their score_inputs: in memory (LRU, per process) and in the
+# sme_latest_score table, which the batched audit writer (data/audit.py) keeps current. A lookup reads
+# the inputs, which is a few indexed queries, and only recomputes when their hash changed. The CRUD
+# functions in data/database.py invalidate the SMEs they touch (invalidate_scores), and the hash check
+# catches anything written around them. Invalidated rows keep their last score for listings.
+SCORE_CACHE_MEMORY_SIZE = 5_000
+
+_score_memory = OrderedDict()       # (db_path, sme_id) -> (input_hash, scores)
+_score_lock = threading.Lock()
+_score_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stale": 0, "invalidations": 0}
+
+def _remember_score(key, input_hash, scores):
+    with _score_lock:
+        _score_memory[key] = (input_hash, scores)
+        _score_memory.move_to_end(key)
+        while len(_score_memory) > SCORE_CACHE_MEMORY_SIZE:
+            _score_memory.popitem(last=False)
+
+def _stored_score(conn, sme_id, input_hash):
+    row = conn.execute("""
+        SELECT input_hash, final_score, financial_score, environmental_score, social_score, gov_score, explanation_json
+        FROM sme_latest_score WHERE sme_id = ?
+    """, (sme_id,)).fetchone()
+    if row is None or row[0] is None:
+        return None, False
+    if row[0] != input_hash:
+        return None, True
+    return tuple(float("nan") if v is None else v for v in row[1:6]) + (json.loads(row[6]),), False
+
+def score_sme(sme_id, industry_sector, region, db_path=None):
+    # Cached scores when the inputs did not change. Otherwise compute, then queue the result for the
+    # audit log and sme_latest_score; the batched writer persists it in the background and only when
+    # the inputs changed, so this never takes a write lock
+    inputs = score_inputs(sme_id, industry_sector, region, db_path)
+    input_hash = score_input_hash(inputs)
+    key = (db_path or get_db_path(), int(sme_id))
+
+    with _score_lock:
+        cached = _score_memory.get(key)
+        if cached is not None and cached[0] == input_hash:
+            _score_memory.move_to_end(key)
+            _score_stats["memory_hits"] += 1
+            return cached[1]
+
+    scores, stale = _stored_score(get_connection(db_path), sme_id, input_hash)
+    with _score_lock:
+        if scores is not None:
+            _score_stats["db_hits"] += 1
+        else:
+            _score_stats["misses"] += 1
+            _score_stats["stale"] += int(stale or cached is not None)
+    if scores is None:
+        scores, _ = compute_sme_score(sme_id, industry_sector, region, db_path, inputs)
+        record_score(sme_id, input_hash, scores, db_path)
+    _remember_score(key, input_hash, scores)
+    return scores
+
+def invalidate_scores(sme_ids, conn=None, db_path=None):
+    """
+    Mark the stored scores of sme_ids as stale. Pass the connection of the write that made them stale,
+    so it goes in the same transaction (the caller commits).
+    """
+    sme_ids = [int(i) for i in sme_ids]
+    conn = conn or get_connection(db_path)
+    conn.execute("UPDATE sme_latest_score SET input_hash = NULL WHERE sme_id IN (SELECT value FROM json_each(?))", (json.dumps(sme_ids),))
+    writer = audit_writer(db_path)
+    path = db_path or get_db_path()
+    with _score_lock:
+        for sme_id in sme_ids:
+            _score_memory.pop((path, sme_id), None)
+            writer.forget(sme_id)
+        _score_stats["invalidations"] += len(sme_ids)
+
+def score_cache_info():
+    """Hit/miss counters of score_sme since process start; stale counts entries found with an old input hash."""
+    with _score_lock:
+        info = dict(_score_stats, memory_size=len(_score_memory), memory_maxsize=SCORE_CACHE_MEMORY_SIZE)
+    lookups = info["memory_hits"] + info["db_hits"] + info["misses"]
+    info["hit_rate"] = (info["memory_hits"] + info["db_hits"]) / lookups if lookups else None
+    return info
+
+# ==========================
+# Batch scoring
+
+def _bin_usage(raw, strip, bins, scores):
+    # Vectorized version of the if/elif usage bins in score_sme: missing or 0 scores 25
+    text = raw.astype("string")
+    for s in strip:
+        text = text.str.replace(s, "", regex=False)
+    value = pd.to_numeric(text.str.strip(), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    binned = np.asarray(scores, dtype=float)[np.digitize(np.nan_to_num(value), bins, right=True)]
+    return np.where(np.isnan(value) | (value == 0), 25.0, binned)
+
+def score_many(sme_ids=None, db_path=None):
+    """
+    Score every SME (or only sme_ids) in one pass, with the same formula as score_sme.
+
+    The sme, supplier, sector and region tables are each read once and all components are
+    computed as column operations. Nothing is written to audit_log.
+
+    Returns:
+        DataFrame indexed by sme_id with final_score, financial_score, environmental_score,
+        social_score, gov_score, governance_score (incl. policy bonus), base_score and suppliers_score
+    """
+    conn = get_connection(db_path)
+    supplier_sql = f"""
+        SELECT sme_id, supplier_name, supplier_sector, supplier_region, supplier_permit,
+               CASE WHEN {SCREENING_CURRENT_SQL}
+                    THEN json_extract(risk_tags, '$.match_score') END AS stored_match
+        FROM supplier
+    """
+    if sme_ids is None:
+        sme = pd.read_sql("SELECT * FROM sme", conn)
+        suppliers = pd.read_sql(supplier_sql, conn)
+    else:
+        ids = json.dumps([int(i) for i in sme_ids])
+        sme = pd.read_sql("SELECT * FROM sme WHERE sme_id IN (SELECT value FROM json_each(?))", conn, params=(ids,))
+        suppliers = pd.read_sql(supplier_sql + " WHERE sme_id IN (SELECT value FROM json_each(?))", conn, params=(ids,))
+
+    sectors = pd.read_sql("SELECT sector, env_risk, soc_risk, gov_risk FROM esg_sector_risks", conn)
+    sector_avg = (sectors["env_risk"] + sectors["soc_risk"] + sectors["gov_risk"]) / 3
+    # abs(normalize(avg, 0, 10) - 100) per sector
+    sector_stability = pd.Series((sector_avg / 10 * 100).clip(0, 100).sub(100).abs().to_numpy(), index=sectors["sector"])
+    region_scores = pd.read_sql("SELECT region, score FROM region_risks", conn).set_index("region")["score"]
+
+    out = pd.DataFrame(index=pd.Index(sme["sme_id"], name="sme_id"))
+    num = lambda col: pd.to_numeric(sme[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    # Financial
+    profitability = np.where(num("is_profitable") == 1, 100.0, 50.0)
+    stability = sme["industry_sector"].map(sector_stability).to_numpy(dtype=float, na_value=np.nan)
+    competition = np.abs(np.clip(np.trunc(num("market_competition")) / 10 * 100, 0, 100) - 100)
+    financial = (profitability + stability + competition) / 3
+
+    # Environment
+    location = sme["region"].map(region_scores).to_numpy(dtype=float, na_value=np.nan)
+    energy = _bin_usage(sme["energy_usage"], ["kwh"], ENERGY_BINS, ENERGY_SCORES)
+    water = _bin_usage(sme["water_usage"], ["m3", "l"], WATER_BINS, WATER_SCORES)
+    waste = sme["waste_management"].map(WASTE_MANAGEMENT_SCORES).fillna(0).to_numpy(dtype=float)
+    ghg = _bin_usage(sme["ghg_emissions"], ["kg CO2e"], GHG_BINS, GHG_SCORES)
+    env = (location + energy + water + waste + ghg) / 5
+    env_bonus = env + np.trunc(num("has_bcp")) + np.trunc(num("denr_permits"))
+
+    # Social
+    soc = (num("pct_emp_health") + num("pct_emp_sss") + (100 - num("emp_turnover_rate"))
+           + num("workplace_safety") + num("emergency_preparedness")) / 5
+
+    # Governance
+    fin_reporting = sme["fin_reporting_freq"].map(FIN_REPORTING_SCORES).fillna(50).to_numpy(dtype=float)
+    gov = (fin_reporting + num("inspection_score")) / 2
+    gov_bonus = gov + np.trunc(num("has_policies"))
+
+    # Supply chain: stored screening results, fuzzy matching only once per distinct unscreened name
+    if suppliers.empty:
+        supplier_avg = pd.Series(dtype=float)
+    else:
+        names = suppliers["supplier_name"].astype(str)
+        stored = pd.to_numeric(suppliers["stored_match"], errors="coerce")
+        name_match = {n: float(check_supplier(n)) for n in names[stored.isna()].unique()}
+        name_score = (stored.fillna(names.map(name_match)) * 100 - 100).abs()
+        sector_score = suppliers["supplier_sector"].astype(str).map(sector_stability)
+        region_score = suppliers["supplier_region"].astype(str).map(region_scores)
+        permit = pd.to_numeric(suppliers["supplier_permit"], errors="coerce")
+        permit_score = np.where(np.trunc(permit) == 1, 100.0, 50.0)
+        supplier_final = (name_score + sector_score + region_score + permit_score) / 4
+        supplier_avg = supplier_final.groupby(suppliers["sme_id"]).mean()
+    suppliers_score = out.index.map(supplier_avg).to_numpy(dtype=float, na_value=np.nan)
+    suppliers_score = np.where(np.isnan(suppliers_score) & ~out.index.isin(supplier_avg.index), 50.0, suppliers_score)
+
+    base = 0.15 * financial + 0.30 * env_bonus + 0.30 * soc + 0.25 * gov_bonus
+    out["final_score"] = (base * 0.60) + (suppliers_score * 0.40)
+    out["financial_score"] = financial
+    out["environmental_score"] = env
+    out["social_score"] = soc
+    out["gov_score"] = gov
+    out["governance_score"] = gov_bonus
+    out["base_score"] = base
+    out["suppliers_score"] = suppliers_score
+    return out
+
+def fill_latest_scores(sme_ids=None, db_path=None, refresh=False):
+    """
+    Batch-score the SMEs without a sme_latest_score row (all of them, or only those in sme_ids) with
+    score_many, so they can be sorted and filtered by score before anyone opened them. With refresh,
+    invalidated rows are re-scored too. The rows have no input_hash: score_sme replaces them with a
+    full entry on the first view.
+
+    Returns:
+        number of rows written
+    """
+    conn = get_connection(db_path)
+    sql = """
+        SELECT s.sme_id FROM sme s LEFT JOIN sme_latest_score l ON l.sme_id = s.sme_id
+        WHERE (l.sme_id IS NULL OR (? AND l.input_hash IS NULL))
+    """
+    params = (int(refresh),)
+    if sme_ids is not None:
+        sql += " AND s.sme_id IN (SELECT value FROM json_each(?))"
+        params += (json.dumps([int(i) for i in sme_ids]),)
+    missing = [r[0] for r in conn.execute(sql, params)]
+    if not missing:
+        return 0
 
-    insert_needed = True
-    if row:
-        last_explanation = json.loads(row[0])
-        if abs(last_explanation["final_score"] - final_score) < 1e-6:
-            insert_needed = False
-
-    if insert_needed:
-        c.execute(
-            "INSERT INTO audit_log (sme_id, explanation_json) VALUES (?, ?)",
-            (sme_id, json.dumps(explanation))
-        )
-    conn.commit()
-    conn.close()
-
-    return final_score, financial_score, env_score, soc_score, gov_score, explanation
+    columns = ["final_score", "financial_score", "environmental_score", "social_score", "gov_score", "suppliers_score"]
+    scores = score_many(missing, db_path)[columns]
+    scores = scores.astype(object).where(scores.notna(), None)
+    with conn:
+        # A row that score_sme completed in the meantime is left alone
+        conn.executemany(f"""
+            INSERT INTO sme_latest_score (sme_id, {', '.join(columns)}, scored_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(sme_id) DO UPDATE SET
+                {', '.join(f'{c} = excluded.{c}' for c in columns)}, scored_at = excluded.scored_at
+            WHERE sme_latest_score.input_hash IS NULL
+        """, [(int(sme_id), *values) for sme_id, *values in scores.itertuples(name=None)])
+    return len(scores)
@@ -0,0 +1,303 @@
+"""
+Bulk supplier screening against supplier_watchlist.
+
+Vendor lists are screened in chunks on a process pool. The watchlist is loaded once in the parent
+and handed to every worker through the pool initializer, so each worker builds its WatchlistIndex
+once instead of receiving it with every chunk. Results come back in input order.
+
+Suppliers in the database keep their screening result in supplier.risk_tags, stamped with the
+watchlist version it was computed against (supplier.screened_version). When the watchlist changes,
+rescreen_suppliers only re-matches suppliers against the entries added since their version, and fully
+re-screens only those whose stored match was removed. Unchanged results are not rewritten: the pass
+records the version it covered once, in watchlist_meta.screened_through.
+
+Usage:
+    python -m utils.screening vendors.csv -o screened.csv [--column supplier_name] [--workers 4]
+    python -m utils.screening vendors.csv -o screened.parquet   (needs pyarrow)
+    python -m utils.screening --rescreen
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from data.connection import get_connection
+from data.csv_stream import open_csv
+from data.database import get_watchlist_version
+from utils.scoring_utils import match_supplier
+from utils.watchlist_index import WatchlistIndex, MIN_EXACT_THRESHOLD
+
+RESULT_FIELDS = ("watchlist_match", "match_score", "risk_tag")
+
+# Per-process index, built by _init_worker
+_index = None
+_options = None
+
+def load_watchlist(db_path=None):
+    conn = get_connection(db_path)
+    return conn.execute("SELECT business_name, risk_tag, clean_name FROM supplier_watchlist").fetchall()
+
+def _init_worker(entries, threshold, scorer):
+    global _index, _options
+    _index = WatchlistIndex(entries)
+    _options = (threshold, scorer)
+
+def _screen_chunk(names):
+    threshold, scorer = _options
+    seen = {}
+    results = []
+    for name in names:
+        if name not in seen:
+            matches = _index.match(str(name), threshold, k=1, scorer=scorer) if name else []
+            best = matches[0] if matches else None
+            seen[name] = (best["business_name"], best["score"], best["risk_tag"]) if best else (None, 0.0, None)
+        results.append(seen[name])
+    return results
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def screen_suppliers(names, threshold=MIN_EXACT_THRESHOLD, scorer="ratio", workers=None, chunk_size=500, db_path=None, watchlist=None):
+    """
+    Best watchlist match for every supplier name, in input order.
+
+    names can be any iterable (it is consumed lazily), only a few chunks per worker are in flight
+    at a time so memory stays flat on very large vendor lists.
+
+    Args:
+        workers: process count, defaults to os.cpu_count(); 1 screens in the current process
+        watchlist: (business_name, risk_tag) rows, loaded from supplier_watchlist when not given
+
+    Yields:
+        (watchlist_match, match_score, risk_tag) per name, (None, 0.0, None) when nothing reaches the threshold
+    """
+    entries = watchlist if watchlist is not None else load_watchlist(db_path)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        _init_worker(entries, threshold, scorer)
+        for chunk in _chunks(names, chunk_size):
+            yield from _screen_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(entries, threshold, scorer)) as pool:
+        pending = deque()
+        for chunk in _chunks(names, chunk_size):
+            pending.append(pool.submit(_screen_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+# Stored screening results
+def _result(match):
+    if not match:
+        return {"watchlist_match": None, "match_score": 0.0, "risk_tag": None}
+    return {"watchlist_match": match["business_name"], "match_score": match["score"], "risk_tag": match["risk_tag"]}
+
+def screen_supplier(supplier_name, threshold=MIN_EXACT_THRESHOLD):
+    """Screen one supplier name, returns (risk_tags JSON, watchlist version) to store on the supplier row."""
+    # Read the version first: if the watchlist changes meanwhile, the row is stale and gets re-screened
+    version = get_watchlist_version()
+    matches = match_supplier(str(supplier_name), threshold, k=1)
+    return json.dumps(_result(matches[0] if matches else None)), version
+
+def _changes_since(conn, version):
+    # Net effect of every watchlist change after version: (business_name, risk_tag) entries still
+    # added, and entries removed
+    added, removed = {}, set()
+    rows = conn.execute(
+        "SELECT change, business_name, risk_tag FROM watchlist_changes WHERE version > ? ORDER BY version, id", (version,)
+    )
+    for change, business_name, risk_tag in rows:
+        entry = (business_name, risk_tag)
+        if change == "added":
+            added[entry] = None
+            removed.discard(entry)
+        else:
+            added.pop(entry, None)
+            removed.add(entry)
+    return WatchlistIndex(added), removed
+
+def rescreen_suppliers(threshold=MIN_EXACT_THRESHOLD, db_path=None):
+    """
+    Bring every supplier's stored screening result up to the current watchlist version.
+
+    Never screened suppliers are matched against the whole watchlist. The others are matched only
+    against the entries added since the version they are current for and keep their stored match
+    unless an added entry scores higher, or their stored match was removed, in which case they are
+    screened again in full. Only results that changed are written; the version every other row is
+    now current for is recorded once in watchlist_meta.screened_through.
+
+    Returns:
+        dict with version, stale (rows looked at), full (full re-screens) and changed (results that changed)
+    """
+    conn = get_connection(db_path)
+    version, screened_through = conn.execute("SELECT version, screened_through FROM watchlist_meta WHERE id = 1").fetchone()
+    stale = conn.execute("""
+        SELECT supplier_id, supplier_name, risk_tags, MAX(screened_version, ?) FROM supplier
+        WHERE screened_version IS NULL OR (screened_version < ? AND ? < ?)
+    """, (screened_through, version, screened_through, version))
+
+    full_index = None
+    full_results = {}
+    changes = {}
+    updates = []
+    stats = {"version": version, "stale": 0, "full": 0, "changed": 0}
+
+    for supplier_id, supplier_name, risk_tags, current_for in stale:
+        name = str(supplier_name)
+        stored = json.loads(risk_tags) if risk_tags and current_for is not None else None
+        result = stored
+        needs_full = stored is None
+        stats["stale"] += 1
+
+        if not needs_full:
+            if current_for not in changes:
+                changes[current_for] = _changes_since(conn, current_for)
+            added_index, removed = changes[current_for]
+            if (stored["watchlist_match"], stored["risk_tag"]) in removed:
+                needs_full = True
+            else:
+                matches = added_index.match(name, threshold, k=1) if len(added_index) else []
+                if matches and matches[0]["score"] > stored["match_score"]:
+                    result = _result(matches[0])
+
+        if needs_full:
+            if name not in full_results:
+                if full_index is None:
+                    full_index = WatchlistIndex(load_watchlist(db_path))
+                matches = full_index.match(name, threshold, k=1)
+                full_results[name] = _result(matches[0] if matches else None)
+            result = full_results[name]
+            stats["full"] += 1
+
+        if result != stored:
+            updates.append((json.dumps(result), version, supplier_id))
+    stats["changed"] = len(updates)
+
+    with conn:
+        conn.executemany("UPDATE supplier SET risk_tags = ?, screened_version = ? WHERE supplier_id = ?", updates)
+        conn.execute("UPDATE watchlist_meta SET screened_through = MAX(screened_through, ?) WHERE id = 1", (version,))
+    return stats
+
+
+class CsvSink:
+    def __init__(self, path, fieldnames):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    def __init__(self, path, fieldnames):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow), or write a .csv instead")
+        self.pa = pa
+        self.fieldnames = fieldnames
+        schema = pa.schema([(f, pa.float64() if f == "match_score" else pa.string()) for f in fieldnames])
+        self.writer = pq.ParquetWriter(path, schema)
+
+    def write(self, rows):
+        columns = {f: [row.get(f) for row in rows] for f in self.fieldnames}
+        for f in self.fieldnames:
+            if f != "match_score":
+                columns[f] = [None if v is None else str(v) for v in columns[f]]
+        self.writer.write_table(self.pa.table(columns, schema=self.writer.schema))
+
+    def close(self):
+        self.writer.close()
+
+def screen_file(input_path, output_path, column="supplier_name", threshold=MIN_EXACT_THRESHOLD, scorer="ratio",
+                workers=None, chunk_size=500, encoding=None, db_path=None):
+    """
+    Stream a vendor CSV through screen_suppliers into a CSV or Parquet file, returns (rows, seconds).
+
+    The encoding is detected unless given, see data/csv_stream.py.
+    """
+    start = time.perf_counter()
+    with open(input_path, "rb") as f:
+        reader, _ = open_csv(f, encoding)
+        if column not in (reader.fieldnames or []):
+            raise SystemExit(f"Column {column!r} not found in {input_path}, columns are {reader.fieldnames}")
+        fieldnames = list(reader.fieldnames) + [r for r in RESULT_FIELDS if r not in reader.fieldnames]
+        sink = (ParquetSink if output_path.endswith(".parquet") else CsvSink)(output_path, fieldnames)
+
+        # The reader is consumed once: rows wait in a queue while their names are being screened
+        rows = deque()
+        def names():
+            for row in reader:
+                rows.append(row)
+                yield row[column]
+
+        count = 0
+        batch = []
+        try:
+            for match, score, risk_tag in screen_suppliers(names(), threshold, scorer, workers, chunk_size, db_path):
+                row = rows.popleft()
+                row.update(watchlist_match=match, match_score=round(score, 4), risk_tag=risk_tag)
+                batch.append(row)
+                count += 1
+                if len(batch) >= chunk_size:
+                    sink.write(batch)
+                    batch = []
+            if batch:
+                sink.write(batch)
+        finally:
+            sink.close()
+    return count, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a vendor list against supplier_watchlist.")
+    parser.add_argument("input", nargs="?", help="vendor CSV")
+    parser.add_argument("-o", "--output", help="output .csv or .parquet")
+    parser.add_argument("--rescreen", action="store_true", help="bring stored supplier screening up to the current watchlist")
+    parser.add_argument("--column", default="supplier_name", help="column holding the supplier name")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--threshold", type=float, default=MIN_EXACT_THRESHOLD)
+    parser.add_argument("--scorer", default="ratio", help="ratio, token_set or jaro_winkler "
+                        "(token_set and jaro_winkler compare every watchlist entry, much slower)")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--encoding", help="input encoding (detected by default)")
+    parser.add_argument("--db", help="database path (defaults to CLARITYESG_DB_PATH / esg_scoring.db)")
+    args = parser.parse_args(argv)
+
+    if args.rescreen:
+        stats = rescreen_suppliers(args.threshold, args.db)
+        print(f"✅ Watchlist version {stats['version']}: {stats['stale']} stale suppliers, "
+              f"{stats['full']} fully re-screened, {stats['changed']} results changed")
+    if not args.input:
+        if not args.rescreen:
+            parser.error("nothing to screen")
+        return 0
+    if not args.output:
+        parser.error("--output is required when screening a file")
+
+    count, elapsed = screen_file(args.input, args.output, args.column, args.threshold, args.scorer,
+                                 args.workers, args.chunk_size, args.encoding, args.db)
+    print(f"✅ Screened {count} suppliers in {elapsed:.1f}s ({count / elapsed if elapsed else 0:,.0f} names/s) -> {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Concurrent, resumable scraper for the SEC suspended/revoked company list (checkwithsec.sec.gov.ph).
+
+Pages are fetched by a small thread pool, all requests share a token-bucket rate limit and failed
+requests are retried with capped exponential backoff. Every finished page is written to
+supplier_watchlist_staging together with its checkpoint row (sec_scrape_pages) in one transaction,
+so a crashed or interrupted run resumes from the pages it has not finished yet and the staged
+snapshot never holds a page twice.
+
+Usage:
+    python -m utils.sec_scraper [--workers 4] [--rate 2] [--max-pages 115] [--fresh] [--publish]
+    python -m utils.sec_scraper --base-url http://127.0.0.1:8765   (benchmarks/sec_fixture_server.py)
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from bs4 import BeautifulSoup
+
+from data.connection import get_connection
+from data.watchlist import stage_rows, clear_staging
+
+BASE_URL = "https://checkwithsec.sec.gov.ph"
+SUSPENDED_PATH = "/check-with-sec/suspended"
+SOURCE = "sec"
+
+
+class TokenBucket:
+    """Allows rate requests per second on average, with bursts of up to capacity requests."""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+class ScrapeError(Exception):
+    pass
+
+
+class SecScraper:
+    def __init__(self, base_url=BASE_URL, workers=4, rate=2.0, max_pages=115, max_retries=6,
+                 backoff_base=1.0, backoff_cap=60.0, timeout=20, db_path=None):
+        self.base_url = base_url.rstrip("/")
+        self.url = self.base_url + SUSPENDED_PATH
+        self.workers = workers
+        self.bucket = TokenBucket(rate)
+        self.max_pages = max_pages
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    # HTTP
+    def _session(self, renew=False):
+        # One session (cookies + csrf token) per worker thread
+        if renew or getattr(self._local, "session", None) is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = "Mozilla/5.0"
+            self.bucket.acquire()
+            response = session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            soup = BeautifulSoup(response.text, "html.parser")
+            self._local.session = session
+            self._local.csrf = soup.find("input", {"name": "_csrf"})["value"]
+        return self._local.session, self._local.csrf
+
+    def backoff(self, attempt):
+        # Capped exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def fetch_page(self, page):
+        """Companies on one page (an empty list past the last page), retried up to max_retries times."""
+        post_headers = {
+            "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+            "Referer": self.url,
+            "X-Requested-With": "XMLHttpRequest",
+            "Origin": self.base_url,
+        }
+        for attempt in range(self.max_retries + 1):
+            try:
+                session, csrf = self._session(renew=attempt > 0)
+                self.bucket.acquire()
+                response = session.post(self.url, headers=post_headers, timeout=self.timeout,
+                                        data={"_csrf": csrf, "user_input": "", "page": page})
+                response.raise_for_status()
+                json_data = response.json()
+                if json_data.get("status") != "success":
+                    raise ScrapeError(f"server error: {json_data.get('response')}")
+                return json_data["response"]["data"]
+            except (requests.RequestException, ValueError, KeyError, TypeError, ScrapeError) as e:
+                if attempt == self.max_retries:
+                    raise ScrapeError(f"page {page} failed after {attempt + 1} attempts: {e}") from e
+                delay = self.backoff(attempt)
+                with self._lock:
+                    self.retries += 1
+                print(f"⚠️ Error on page {page}: {e}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def fetch_all(self):
+        """Every company on every page, in memory and without checkpoints."""
+        companies = {}
+        self._crawl(set(), lambda page, rows: companies.__setitem__(page, rows))
+        return [c for page in sorted(companies) for c in companies[page]]
+
+    def _crawl(self, done_pages, on_page):
+        """
+        Fetch pages 1..max_pages not in done_pages with at most `workers` requests in flight, calling
+        on_page(page, companies) from this thread. Returns the last non-empty page seen, if the end was found.
+        """
+        last_page = None
+        todo = iter(p for p in range(1, self.max_pages + 1) if p not in done_pages)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+
+            def submit_next():
+                for page in todo:
+                    if last_page is None or page <= last_page:
+                        running[pool.submit(self.fetch_page, page)] = page
+                        return
+
+            for _ in range(self.workers):
+                submit_next()
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    page = running.pop(future)
+                    companies = future.result()
+                    if not companies:
+                        last_page = page - 1 if last_page is None else min(last_page, page - 1)
+                    elif last_page is None or page <= last_page:
+                        on_page(page, companies)
+                    submit_next()
+        return last_page
+
+    # Checkpointed run
+    def run(self, fresh=False):
+        """
+        Scrape into supplier_watchlist_staging, resuming the last unfinished run unless fresh=True.
+
+        Returns:
+            dict with run_id, pages (fetched this time), resumed (pages skipped), rows, retries and seconds
+        """
+        conn = get_connection(self.db_path)
+        start = time.perf_counter()
+        row = None if fresh else conn.execute(
+            "SELECT run_id FROM sec_scrape_runs WHERE status = 'running' ORDER BY run_id DESC LIMIT 1"
+        ).fetchone()
+        if row:
+            run_id = row[0]
+        else:
+            conn.execute("DELETE FROM sec_scrape_runs WHERE status = 'running'")
+            clear_staging(SOURCE, conn)
+            run_id = conn.execute("INSERT INTO sec_scrape_runs (max_pages) VALUES (?)", (self.max_pages,)).lastrowid
+            conn.commit()
+
+        done_pages = {p for (p,) in conn.execute("SELECT page FROM sec_scrape_pages WHERE run_id = ?", (run_id,))}
+        stats = {"run_id": run_id, "pages": 0, "resumed": len(done_pages), "rows": 0, "retries": 0}
+
+        def on_page(page, companies):
+            # Staged rows and the checkpoint land in the same transaction
+            staged = stage_rows(SOURCE, ((c.get("company_name"), None) for c in companies), conn, commit=False)
+            conn.execute("INSERT INTO sec_scrape_pages (run_id, page, rows) VALUES (?, ?, ?)", (run_id, page, staged))
+            conn.commit()
+            stats["pages"] += 1
+            stats["rows"] += staged
+            print(f"✅ Page {page} scraped, got {len(companies)} records")
+
+        last_page = self._crawl(done_pages, on_page)
+        conn.execute(
+            "UPDATE sec_scrape_runs SET status = 'done', last_page = ?, finished_at = CURRENT_TIMESTAMP WHERE run_id = ?",
+            (last_page if last_page is not None else self.max_pages, run_id)
+        )
+        conn.commit()
+
+        stats["retries"] = self.retries
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape the SEC suspended company list into watchlist staging.")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second, shared by all workers")
+    parser.add_argument("--max-pages", type=int, default=115)
+    parser.add_argument("--max-retries", type=int, default=6)
+    parser.add_argument("--fresh", action="store_true", help="start over instead of resuming the last unfinished run")
+    parser.add_argument("--publish", action="store_true", help="apply the staged snapshot to supplier_watchlist when done")
+    parser.add_argument("--db", help="database path (defaults to CLARITYESG_DB_PATH / esg_scoring.db)")
+    args = parser.parse_args(argv)
+
+    scraper = SecScraper(args.base_url, args.workers, args.rate, args.max_pages, args.max_retries, db_path=args.db)
+    stats = scraper.run(fresh=args.fresh)
+    print(f"✅ Run {stats['run_id']}: {stats['pages']} pages ({stats['resumed']} resumed), {stats['rows']} rows, "
+          f"{stats['retries']} retries in {stats['seconds']:.1f}s")
+    if args.publish:
+        from data.watchlist import publish_staged
+        # One-off run: no matcher index of this process to warm
+        result = publish_staged(SOURCE, warm=False, db_path=args.db)
+        print(f"✅ sec: +{result['inserted']} -{result['deleted']} ({result['unchanged']} unchanged), watchlist version {result['version']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import difflib
+
+# Similarity scorers for watchlist matching.
+#
+# A scorer is prepared once per query and then asked for cheap upper bounds before the real score,
+# in order, so hopeless candidates are dropped as early as possible:
+#
+#     bounds(candidate) -> [length bound, character multiset bound, ...]   (each >= the real score)
+#     score(candidate)  -> similarity in 0.0–1.0
+#
+# All scorers expect names already cleaned with clean_sme_name.
+#
+# Only indexed scorers can be used per supplier (check_supplier / match_supplier): WatchlistIndex
+# narrows their candidates with a lossless bound. The others have no such bound and compare every
+# watchlist entry (a few hundred ms per name on the full watchlist), so they are for offline bulk
+# screening only (python -m utils.screening --scorer ...).
+
+
+class SequenceRatio:
+    """difflib.SequenceMatcher(None, query, candidate).ratio(), the score check_supplier has always used."""
+    name = "ratio"
+    # WatchlistIndex bigram candidates are lossless for this scorer (see utils/watchlist_index.py)
+    indexed = True
+
+    def __init__(self, query):
+        self.query = query
+        self.q_len = len(query)
+        # Bounds are symmetric, so keep the query as seq2: its character counts are built once.
+        self._bounds = difflib.SequenceMatcher(None, "", query)
+        self._matcher = difflib.SequenceMatcher(None, query)
+
+    def bounds(self, candidate):
+        total = self.q_len + len(candidate)
+        # real_quick_ratio: the matched length can never exceed the shorter name
+        yield 2.0 * min(self.q_len, len(candidate)) / total if total else 1.0
+        # quick_ratio: characters shared as a multiset
+        self._bounds.set_seq1(candidate)
+        yield self._bounds.quick_ratio()
+
+    def score(self, candidate):
+        self._matcher.set_seq2(candidate)
+        return self._matcher.ratio()
+
+
+class TokenSetRatio:
+    """Word-order insensitive ratio: compares the shared words plus each side's leftover words. Offline only."""
+    name = "token_set"
+    indexed = False
+
+    def __init__(self, query):
+        self.tokens = set(query.split())
+
+    def bounds(self, candidate):
+        return ()
+
+    def score(self, candidate):
+        tokens = set(candidate.split())
+        shared = " ".join(sorted(self.tokens & tokens))
+        left = " ".join([shared] + sorted(self.tokens - tokens)).strip()
+        right = " ".join([shared] + sorted(tokens - self.tokens)).strip()
+        if not left and not right:
+            return 1.0
+        ratio = lambda a, b: difflib.SequenceMatcher(None, a, b).ratio()
+        return max(ratio(shared, left), ratio(shared, right), ratio(left, right))
+
+
+class JaroWinkler:
+    """Jaro-Winkler similarity with the standard 0.1 prefix scale over at most 4 characters. Offline only."""
+    name = "jaro_winkler"
+    indexed = False
+    prefix_scale = 0.1
+
+    def __init__(self, query):
+        self.query = query
+
+    def bounds(self, candidate):
+        # At most min(len) characters can match, and winkler's boost is increasing in the jaro score
+        a_len, b_len = len(self.query), len(candidate)
+        if not a_len or not b_len:
+            yield 1.0 if a_len == b_len else 0.0
+            return
+        shortest = min(a_len, b_len)
+        jaro = (shortest / a_len + shortest / b_len + 1) / 3
+        yield jaro + 4 * self.prefix_scale * (1 - jaro)
+
+    def score(self, candidate):
+        return jaro_winkler(self.query, candidate, self.prefix_scale)
+
+
+def jaro(a, b):
+    if a == b:
+        return 1.0
+    a_len, b_len = len(a), len(b)
+    if not a_len or not b_len:
+        return 0.0
+
+    window = max(max(a_len, b_len) // 2 - 1, 0)
+    a_matched = [False] * a_len
+    b_matched = [False] * b_len
+    matches = 0
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(i + window + 1, b_len)):
+            if not b_matched[j] and b[j] == ch:
+                a_matched[i] = b_matched[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+
+    transpositions = 0
+    j = 0
+    for i in range(a_len):
+        if a_matched[i]:
+            while not b_matched[j]:
+                j += 1
+            if a[i] != b[j]:
+                transpositions += 1
+            j += 1
+
+    return (matches / a_len + matches / b_len + (matches - transpositions / 2) / matches) / 3
+
+def jaro_winkler(a, b, prefix_scale=0.1):
+    score = jaro(a, b)
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return score + prefix * prefix_scale * (1 - score)
+
+
+SCORERS = {scorer.name: scorer for scorer in (SequenceRatio, TokenSetRatio, JaroWinkler)}
+
+def get_scorer(name="ratio", indexed=False):
+    """indexed=True only accepts scorers WatchlistIndex can narrow candidates for (the per-supplier path)."""
+    try:
+        scorer = SCORERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown scorer {name!r}, expected one of {sorted(SCORERS)}")
+    if indexed and not scorer.indexed:
+        online = sorted(n for n, s in SCORERS.items() if s.indexed)
+        raise ValueError(f"Scorer {name!r} scans the whole watchlist and is for offline screening only "
+                         f"(python -m utils.screening --scorer {name}), per supplier use one of {online}")
+    return scorer
@@ -0,0 +1,251 @@
+from array import array
+import math
+import numpy as np
+from utils.similarity import get_scorer
+
+# Watchlist fuzzy-matching index.
+#
+# Names are cleaned once when the index is built, ordered by length (so every length range is a
+# contiguous run of entry ids) and posted under their character bigrams. A query is only compared
+# with entries whose length is compatible and which share enough bigrams to reach the threshold.
+#
+# The bigram count filter is lossless for the SequenceMatcher ratio at any threshold. A ratio of
+# 2M/T (T the two lengths added up) needs M matched characters in b matching blocks, and every block
+# of length L gives L - 1 bigrams found in both names, so they share at least M - b bigrams. Two
+# consecutive blocks are separated by at least one unmatched character, so b <= T - 2M + 1 and the
+# names share at least 3M - T - 1 bigrams, M being the smallest that reaches the threshold.
+# Counting works on distinct bigrams weighted by how often they occur in the query, which can only
+# overestimate the shared count.
+#
+# Candidates are looked up rarest bigram first: an entry sharing `need` bigrams must hold one of the
+# query bigrams left once the most common ones, together worth less than `need`, are set aside. Only
+# those postings are merged and counted; the common ones are then probed, one by one, only for the
+# candidates that can still reach their count.
+# Queries too short for the count to prune anything scan their length range. Scorers other than the
+# SequenceMatcher ratio scan every (pre-cleaned) entry.
+
+MIN_EXACT_THRESHOLD = 0.8
+
+def clean_sme_name(name):
+    replace_words = ["INCORPORATED", "CORPORATION", "RESPONDENT", "INC", "COMPANY", ".", ","]
+    name = name.upper()
+    for r in replace_words:
+        name = name.replace(r, "")
+    return " ".join(name.split())
+
+def bigrams(clean_name):
+    """Bigram -> number of occurrences in clean_name."""
+    counts = {}
+    for i in range(len(clean_name) - 1):
+        gram = clean_name[i:i + 2]
+        counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+def _min_matched(totals, threshold):
+    # Smallest number of matched characters M with 2M / total >= threshold, for each total
+    return np.maximum(0, np.ceil(threshold * totals / 2 - 1e-9)).astype(np.int64)
+
+def _length_range(q_len, threshold):
+    # Lengths L with 2 * min(q_len, L) / (q_len + L) >= threshold (real_quick_ratio)
+    if threshold <= 0:
+        return 0, None
+    if q_len == 0:
+        return 0, 0
+    lo = math.ceil(q_len * threshold / (2 - threshold) - 1e-9)
+    hi = math.floor(q_len * (2 - threshold) / threshold + 1e-9)
+    return lo, hi
+
+
+class WatchlistIndex:
+    def __init__(self, entries):
+        """
+        entries: iterable of (business_name, risk_tag) or (business_name, risk_tag, clean_name) rows from
+        supplier_watchlist, a stored clean_name is used as is instead of cleaning the name again
+        """
+        rows = []
+        for position, (business_name, risk_tag, *stored) in enumerate(entries):
+            clean = stored[0] if stored and stored[0] is not None else clean_sme_name(str(business_name))
+            rows.append((len(clean), position, business_name, risk_tag, clean))
+        rows.sort(key=lambda r: (r[0], r[1]))
+
+        # Entry ids follow the length order; order keeps the input position for ties between results
+        self.order = [r[1] for r in rows]
+        self.names = [r[2] for r in rows]
+        self.risk_tags = [r[3] for r in rows]
+        self.clean_names = [r[4] for r in rows]
+        self.by_clean = {}
+        postings = {}
+        for entry_id, clean in enumerate(self.clean_names):
+            self.by_clean.setdefault(clean, []).append(entry_id)
+            for gram in bigrams(clean):
+                postings.setdefault(gram, array("I")).append(entry_id)
+
+        # Sorted by construction, so a length range of a posting list is found by bisection
+        self.postings = {gram: np.frombuffer(ids, dtype=np.uint32) for gram, ids in postings.items()}
+
+        # Name lengths and per-character counts, so the length and quick_ratio bounds of the
+        # SequenceMatcher ratio can be checked for all candidates at once
+        self.lengths = np.fromiter((len(c) for c in self.clean_names), dtype=np.int64, count=len(self.clean_names))
+        self.alphabet = {ch: col for col, ch in enumerate(sorted(set("".join(self.clean_names))))}
+        max_count = max((max(map(c.count, set(c)), default=0) for c in self.clean_names), default=0)
+        self.char_counts = np.zeros((len(self.clean_names), len(self.alphabet)), dtype=np.min_scalar_type(max_count))
+        for entry_id, clean in enumerate(self.clean_names):
+            for ch in clean:
+                self.char_counts[entry_id, self.alphabet[ch]] += 1
+
+    def __len__(self):
+        return len(self.names)
+
+    def _id_range(self, lo, hi):
+        start = int(np.searchsorted(self.lengths, lo, side="left"))
+        end = len(self.lengths) if hi is None else int(np.searchsorted(self.lengths, hi, side="right"))
+        return start, end
+
+    def candidates(self, clean_query, threshold=MIN_EXACT_THRESHOLD):
+        """Entry ids that can reach the threshold against an already cleaned query, exact name matches first."""
+        q_len = len(clean_query)
+        lo, hi = _length_range(q_len, threshold)
+        start, end = self._id_range(lo, hi)
+        ids = self._bigram_candidates(clean_query, threshold, start, end)
+
+        exact = self.by_clean.get(clean_query)
+        if exact:
+            ids = np.concatenate([np.asarray(exact, dtype=ids.dtype), ids[~np.isin(ids, exact)]])
+        return ids
+
+    def _bigram_candidates(self, clean_query, threshold, start, end):
+        if start >= end:
+            return np.empty(0, dtype=np.int64)
+        q_len = len(clean_query)
+        lengths = np.arange(self.lengths[start], self.lengths[end - 1] + 1)
+        totals = q_len + lengths
+        needs = 3 * _min_matched(totals, threshold) - totals - 1
+        if needs.min() <= 0:
+            return np.arange(start, end)
+
+        # (weight, postings restricted to the length range), rarest first
+        grams = []
+        for gram, weight in bigrams(clean_query).items():
+            posting = self.postings.get(gram)
+            if posting is None:
+                continue
+            lo, hi = np.searchsorted(posting, [start, end])
+            if hi > lo:
+                grams.append((hi - lo, weight, posting[lo:hi]))
+        grams.sort(key=lambda g: g[0])
+        weight_left = sum(weight for _, weight, _ in grams)
+        need_min = int(needs.min())
+        if weight_left < need_min:
+            return np.empty(0, dtype=np.int64)
+
+        probe = 0
+        while weight_left >= need_min:
+            weight_left -= grams[probe][1]
+            probe += 1
+        merged = np.concatenate([posting for _, _, posting in grams[:probe]])
+        weights = np.repeat([weight for _, weight, _ in grams[:probe]], [len(p) for _, _, p in grams[:probe]])
+        ids, inverse = np.unique(merged, return_inverse=True)
+        ids = ids.astype(np.int64)
+        shared = np.bincount(inverse, weights=weights).astype(np.int64)
+        need = needs[self.lengths[ids] - lengths[0]]
+
+        # Probe the common bigrams only for ids that can still reach their need
+        for _, weight, posting in grams[probe:]:
+            keep = shared + weight_left >= need
+            ids, shared, need = ids[keep], shared[keep], need[keep]
+            pos = np.searchsorted(posting, ids)
+            hit = pos < len(posting)
+            hit[hit] = posting[pos[hit]] == ids[hit]
+            shared += weight * hit
+            weight_left -= weight
+        return ids[shared >= need]
+
+    def quick_filter(self, ids, clean_query, threshold):
+        """Drop candidates whose length or character-multiset bound (real_quick_ratio / quick_ratio) is below threshold."""
+        if not len(ids):
+            return ids
+        q_len = len(clean_query)
+        lengths = self.lengths[ids]
+        total = q_len + lengths
+        safe_total = np.maximum(total, 1)
+
+        q_counts = np.zeros(len(self.alphabet), dtype=np.int64)
+        for ch in clean_query:
+            col = self.alphabet.get(ch)
+            if col is not None:
+                q_counts[col] += 1
+        shared = np.minimum(self.char_counts[ids], q_counts).sum(axis=1)
+
+        length_bound = np.where(total > 0, 2.0 * np.minimum(q_len, lengths) / safe_total, 1.0)
+        quick_bound = np.where(total > 0, 2.0 * shared / safe_total, 1.0)
+        return ids[(length_bound >= threshold) & (quick_bound >= threshold)]
+
+    def match(self, supplier_name, threshold=MIN_EXACT_THRESHOLD, k=None, scorer="ratio", stats=None, clean=True):
+        """
+        Watchlist entries whose similarity to supplier_name reaches the threshold.
+
+        Candidates go through the scorer's cheap upper bounds before the real score, and the scan stops
+        early once k perfect (1.0) matches are found.
+
+        Args:
+            scorer: name of a scorer in utils.similarity.SCORERS ("ratio", "token_set", "jaro_winkler");
+                only "ratio" uses the index, the others scan the whole watchlist (offline screening only,
+                see utils.similarity)
+            stats: optional dict, filled with how many candidates each stage dropped
+            clean: False when supplier_name is already cleaned with clean_sme_name (it is not idempotent)
+
+        Returns:
+            list of dicts { "business_name", "risk_tag", "score" }, best first, at most k when k is given
+        """
+        s_clean = clean_sme_name(supplier_name) if clean else supplier_name
+        scorer_cls = get_scorer(scorer)
+        prepared = scorer_cls(s_clean)
+        if scorer_cls.indexed:
+            ids = self.candidates(s_clean, threshold)
+            candidates = len(ids)
+            ids = self.quick_filter(ids, s_clean, threshold).tolist()
+        else:
+            ids = range(len(self.names))
+            candidates = len(ids)
+
+        results = []
+        perfect = 0
+        pruned = [0, 0, 0]
+        scored = 0
+        for i in ids:
+            candidate = self.clean_names[i]
+            hopeless = False
+            for stage, bound in enumerate(prepared.bounds(candidate)):
+                if bound < threshold:
+                    pruned[min(stage, 2)] += 1
+                    hopeless = True
+                    break
+            if hopeless:
+                continue
+
+            scored += 1
+            score = prepared.score(candidate)
+            if score >= threshold:
+                results.append((score, self.order[i], i))
+                if score == 1.0:
+                    perfect += 1
+                    if k is not None and perfect >= k:
+                        break
+
+        if stats is not None:
+            stats["entries"] = stats.get("entries", 0) + len(self.names)
+            stats["candidates"] = stats.get("candidates", 0) + candidates
+            stats["vector_pruned"] = stats.get("vector_pruned", 0) + candidates - len(ids)
+            for stage, count in enumerate(pruned):
+                stats[f"pruned_bound_{stage}"] = stats.get(f"pruned_bound_{stage}", 0) + count
+            stats["scored"] = stats.get("scored", 0) + scored
+            stats["matched"] = stats.get("matched", 0) + len(results)
+
+        # Best first, ties in watchlist order
+        results.sort(key=lambda r: (-r[0], r[1]))
+        return [{"business_name": self.names[i], "risk_tag": self.risk_tags[i], "score": score}
+                for score, _, i in results[:k]]
+
+    def best_score(self, supplier_name, threshold=MIN_EXACT_THRESHOLD, scorer="ratio", clean=True):
+        results = self.match(supplier_name, threshold, k=1, scorer=scorer, clean=clean)
+        return results[0]["score"] if results else 0.0